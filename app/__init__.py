@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 import os
 
 from app.models import db
+from . import metrics, storage
 from .routes import blueprints
 
 load_dotenv()
@@ -10,22 +11,85 @@ load_dotenv()
 
 def create_app():
     app = Flask(__name__)
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///course.db"
+    storage.configure(app)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SQLALCHEMY_ECHO"] = True
+    app.config["AVAILABILITY_RESOLUTION"] = int(
+        os.environ.get("AVAILABILITY_RESOLUTION", 5)
+    )
+    app.config["SCHEDULE_SEARCH_BUDGET_MS"] = float(
+        os.environ.get("SCHEDULE_SEARCH_BUDGET_MS", 250)
+    )
+    app.config["RANKING_CACHE_SIZE"] = int(os.environ.get("RANKING_CACHE_SIZE", 1024))
+    app.config["RANKING_CACHE_DB_SIZE"] = int(
+        os.environ.get("RANKING_CACHE_DB_SIZE", 10000)
+    )
+    app.config["RANKING_CACHE_TTL"] = int(os.environ.get("RANKING_CACHE_TTL", 86400))
+    app.config["POOL_CACHE_SIZE"] = int(os.environ.get("POOL_CACHE_SIZE", 1024))
+    app.config["RANKER"] = os.environ.get("RANKER", "gpt")
+    app.config["RANKER_INDEX_PATH"] = os.environ.get("RANKER_INDEX_PATH")
+    app.config["BATCH_WORKERS"] = int(os.environ.get("BATCH_WORKERS", 4))
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))
+    app.config["JOB_WORKER_MODE"] = os.environ.get("JOB_WORKER_MODE", "thread")
+    app.config["JOB_POLL_INTERVAL"] = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+    app.config["JOB_LEASE_SECONDS"] = float(os.environ.get("JOB_LEASE_SECONDS", 60))
+    app.config["STREAM_RESPONSES"] = os.environ.get("STREAM_RESPONSES") == "1"
+    app.config["STREAM_BATCH_SIZE"] = int(os.environ.get("STREAM_BATCH_SIZE", 500))
+    app.config["JSON_ENCODER"] = os.environ.get("JSON_ENCODER", "json")
+    app.config["CATALOG_VERSION_CHECK"] = float(
+        os.environ.get("CATALOG_VERSION_CHECK", 5)
+    )
+    app.config["ROSTER_SNAPSHOT"] = os.environ.get("ROSTER_SNAPSHOT")
+    app.config["ROSTER_API_BASE"] = os.environ.get("ROSTER_API_BASE")
+    app.config["ROSTER"] = os.environ.get("ROSTER", "FA24")
+    app.config["ROSTER_SUBJECTS"] = os.environ.get("ROSTER_SUBJECTS", "CS").split(",")
+    app.config["ROSTER_FETCH_WORKERS"] = int(os.environ.get("ROSTER_FETCH_WORKERS", 4))
+    app.config["PLAN_BUDGET_MS"] = float(os.environ.get("PLAN_BUDGET_MS", 2000))
+    app.config["PLAN_TERM_BUDGET_MS"] = float(
+        os.environ.get("PLAN_TERM_BUDGET_MS", 50)
+    )
+    app.config["PLAN_BRANCHING"] = int(os.environ.get("PLAN_BRANCHING", 3))
+    app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "1") == "1"
 
     db.init_app(app)
 
     with app.app_context():
+        storage.init_engine(db.engine)
+        metrics.init_app(app, db.engine)
         db.create_all()
 
+        from .models.schema import upgrade_schema
+
+        upgrade_schema()
+
+        from .schedule_store import backfill_schedule_hashes
+
+        backfill_schedule_hashes()
+
+        from .scripts.scraper import backfill_core_requirements, backfill_prereq_trees
+
+        backfill_core_requirements()
+        backfill_prereq_trees()
+
+        from .catalog import rebuild_catalog
+
+        rebuild_catalog()
+
+        from .ranker import load_tfidf_index
+
+        load_tfidf_index()
+
     from .routes import blueprints
 
     for bp in blueprints:
         app.register_blueprint(bp)
 
     from .scripts.seeder import seed_all
+    from .scripts.sync import sync_catalog_command
+    from .jobs import init_app as init_jobs, run_jobs
 
     app.cli.add_command(seed_all)
+    app.cli.add_command(sync_catalog_command)
+    app.cli.add_command(run_jobs)
+    init_jobs(app)
 
     return app
@@ -0,0 +1,219 @@
+import json
+from flask import current_app
+
+"""
+Bit-packed weekly availability.
+
+A week is cut into slots of `resolution` minutes (5 by default). Slot
+`day * slots_per_day + minute // resolution` is bit that many places up in a
+plain Python int, so a week at 5 minute resolution is a 2016-bit integer.
+A user's availability is the set of free slots, and a section's occupancy is
+the set of slots it meets in, so "does this section fit" is a single AND
+against the user's busy mask.
+
+Two input formats are accepted:
+- the legacy string of '0'/'1' characters indexed by `day + 7 * hour`
+- a list of free windows, eg. [{"days": "MWF", "start_min": 480, "end_min": 720}]
+"""
+
+DEFAULT_RESOLUTION = 5
+MINUTES_PER_DAY = 24 * 60
+DAYS_PER_WEEK = 7
+LEGACY_LENGTH = DAYS_PER_WEEK * 24
+DAY_INDEX = {"M": 0, "T": 1, "W": 2, "R": 3, "F": 4, "S": 5, "Su": 6}
+
+
+def get_resolution():
+    """
+    Slot size in minutes configured for this app.
+    """
+    resolution = current_app.config.get("AVAILABILITY_RESOLUTION", DEFAULT_RESOLUTION)
+    if resolution <= 0 or 60 % resolution:
+        raise ValueError("AVAILABILITY_RESOLUTION must evenly divide 60.")
+    return resolution
+
+
+def slots_per_day(resolution):
+    return MINUTES_PER_DAY // resolution
+
+
+def full_mask(resolution):
+    """
+    Mask with every slot of the week set.
+    """
+    return (1 << (DAYS_PER_WEEK * slots_per_day(resolution))) - 1
+
+
+def parse_days(days):
+    """
+    Turn a meeting pattern like "MWF" or "TRSu" into day indices.
+    Unknown letters (eg. "TBA") are ignored.
+    """
+    if not days or days == "TBA":
+        return []
+    indices = []
+    i = 0
+    while i < len(days):
+        if days.startswith("Su", i):
+            indices.append(DAY_INDEX["Su"])
+            i += 2
+            continue
+        if days[i] in DAY_INDEX:
+            indices.append(DAY_INDEX[days[i]])
+        i += 1
+    return indices
+
+
+def interval_mask(days, start_min, end_min, resolution):
+    """
+    Slots touched by [start_min, end_min) on each of the given days.
+    Partial slots count as occupied.
+    """
+    if start_min is None or end_min is None or end_min <= start_min:
+        return 0
+    per_day = slots_per_day(resolution)
+    lo = max(start_min, 0) // resolution
+    hi = min(-(-end_min // resolution), per_day)
+    if hi <= lo:
+        return 0
+    run = (1 << (hi - lo)) - 1
+    mask = 0
+    for day in parse_days(days):
+        mask |= run << (day * per_day + lo)
+    return mask
+
+
+def occupancy_mask(section, resolution):
+    """
+    Precomputed footprint of a section (anything with days/start_min/end_min).
+    """
+    return interval_mask(section.days, section.start_min, section.end_min, resolution)
+
+
+def legacy_to_mask(bits, resolution):
+    """
+    Convert the legacy hourly '0'/'1' string. Missing hours are unavailable.
+    """
+    per_day = slots_per_day(resolution)
+    per_hour = 60 // resolution
+    run = (1 << per_hour) - 1
+    mask = 0
+    for index, ch in enumerate(bits[:LEGACY_LENGTH]):
+        if ch == "1":
+            day, hour = index % DAYS_PER_WEEK, index // DAYS_PER_WEEK
+            mask |= run << (day * per_day + hour * per_hour)
+    return mask
+
+
+def windows_to_mask(windows, resolution):
+    """
+    Convert a list of free windows. Only whole slots inside a window count as
+    free, so a window never claims time the user did not give.
+    """
+    per_day = slots_per_day(resolution)
+    mask = 0
+    for window in windows:
+        start, end = window["start_min"], window["end_min"]
+        lo = -(-start // resolution)
+        hi = min(end // resolution, per_day)
+        if hi <= lo:
+            continue
+        run = (1 << (hi - lo)) - 1
+        for day in parse_days(window["days"]):
+            mask |= run << (day * per_day + lo)
+    return mask
+
+
+def parse_availability(value, resolution):
+    """
+    Validate an availability payload and return (stored_value, mask).
+    Raises ValueError if the payload is not in a supported format.
+    """
+    if isinstance(value, str):
+        if not value or set(value) - {"0", "1"}:
+            raise ValueError("Availability string must contain only '0' and '1'.")
+        return value, legacy_to_mask(value, resolution)
+    if isinstance(value, list):
+        try:
+            mask = windows_to_mask(value, resolution)
+        except (KeyError, TypeError):
+            raise ValueError(
+                "Availability windows need days, start_min and end_min fields."
+            )
+        return json.dumps(value), mask
+    raise ValueError("Availability must be a bit string or a list of windows.")
+
+
+def stored_to_mask(stored, resolution):
+    """
+    Convert a value stored in User.availability into a mask.
+    """
+    if not stored:
+        return 0
+    if stored.startswith("["):
+        return windows_to_mask(json.loads(stored), resolution)
+    return legacy_to_mask(stored, resolution)
+
+
+def display_availability(stored):
+    """
+    Value returned to clients: windows come back as a list, legacy as a string.
+    """
+    if stored and stored.startswith("["):
+        return json.loads(stored)
+    return stored
+
+
+def encode_mask(mask, resolution):
+    nbytes = (DAYS_PER_WEEK * slots_per_day(resolution) + 7) // 8
+    return mask.to_bytes(nbytes, "little")
+
+
+def decode_mask(blob):
+    return int.from_bytes(blob, "little")
+
+
+def resample(mask, from_resolution, to_resolution):
+    """
+    Re-bucket a free mask. A target slot is free only if every source slot
+    it overlaps is free.
+    """
+    if from_resolution == to_resolution:
+        return mask
+    total = DAYS_PER_WEEK * MINUTES_PER_DAY
+    result = 0
+    for slot in range(total // to_resolution):
+        start = slot * to_resolution
+        lo = start // from_resolution
+        hi = -(-(start + to_resolution) // from_resolution)
+        run = ((1 << (hi - lo)) - 1) << lo
+        if mask & run == run:
+            result |= 1 << slot
+    return result
+
+
+def user_free_mask(user, resolution):
+    """
+    Free mask for a user at the given resolution, using the packed column when
+    it is present and falling back to the stored string for older rows.
+    """
+    if user.availability_mask is not None and user.availability_resolution:
+        mask = decode_mask(user.availability_mask)
+        return resample(mask, user.availability_resolution, resolution)
+    return stored_to_mask(user.availability, resolution)
+
+
+def busy_mask(free, resolution):
+    return full_mask(resolution) & ~free
+
+
+def apply_availability(user, value):
+    """
+    Store an availability payload on a user, both as given and packed.
+    Raises ValueError if the payload is malformed.
+    """
+    resolution = get_resolution()
+    stored, mask = parse_availability(value, resolution)
+    user.availability = stored
+    user.availability_mask = encode_mask(mask, resolution)
+    user.availability_resolution = resolution
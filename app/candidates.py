@@ -0,0 +1,305 @@
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_app_context
+from .solver import CORE, ELECTIVE, GRAD
+
+"""
+Candidate pools: every section a user is eligible for and free to attend,
+bucketed into core, elective and grad-level courses. A core course counts as
+core only while its requirement is unmet: once the user has CS 1110, CS 1112
+is an elective like any other.
+
+Building a pool evaluates every course's requirements and filters every
+section against the user's busy time, so PoolCache keeps one per user. An
+entry remembers what it was built from (catalog version, completed courses,
+busy mask) and is only redone in part when one of those changes:
+
+- a new catalog version rebuilds it;
+- adding or removing a completed course re-checks that course and the
+  courses whose requirements name it (PrereqGraph.dependents);
+- new availability keeps the eligible courses and only re-filters sections.
+
+The user routes report completions and availability changes as they are
+written. Lookups also compare the stored inputs with the user's current
+ones, so writes made by another process (eg. a job worker) are picked up.
+"""
+
+# Larger differences in completed courses rebuild the entry instead
+MAX_INCREMENTAL = 8
+
+# Each bucket holds (course, section) pairs in catalog order; `core_groups`
+# maps the core bucket's course numbers to their requirement
+CandidatePool = namedtuple(
+    "CandidatePool", ["core", "elective", "grad", "num_core_completed", "core_groups"]
+)
+
+
+def is_grad_level(course_number):
+    match = re.match(r"[A-Z]+ (\d{4})", course_number)
+    return int(match.group(1)) >= 5000 if match else False
+
+
+def core_met(catalog, completed):
+    """
+    Indices (into catalog.core_groups) of the core requirements `completed`
+    meets.
+    """
+    return {catalog.core_group[num] for num in completed if num in catalog.core_group}
+
+
+def course_kind(catalog, number, met=()):
+    if is_grad_level(number):
+        return GRAD
+    if number in catalog.core and catalog.core_group[number] not in met:
+        return CORE
+    return ELECTIVE
+
+
+def attendable(catalog, number, busy):
+    """
+    (course, section) pairs for the sections of a course that avoid `busy`.
+    """
+    course = catalog.courses[number]
+    return [
+        (course, section)
+        for section in catalog.sections_by_course.get(number, ())
+        if not section.mask & busy
+    ]
+
+
+def eligible_courses(catalog, completed):
+    """
+    Numbers of the courses whose requirements `completed` meets, minus the
+    completed ones.
+    """
+    eligible = catalog.requirements.eligible(completed)
+    return {
+        number
+        for number, ok in zip(catalog.courses, eligible)
+        if ok and number not in completed
+    }
+
+
+def course_pairs(catalog, numbers, busy):
+    """
+    {number: attendable pairs} for the courses with at least one section.
+    """
+    pairs = {}
+    for number in numbers:
+        found = attendable(catalog, number, busy)
+        if found:
+            pairs[number] = found
+    return pairs
+
+
+def pool_from_pairs(catalog, pairs, completed):
+    """
+    Bucket {number: pairs} into a CandidatePool, in catalog order.
+    """
+    pos = catalog.requirements.pos
+    met = core_met(catalog, completed)
+    buckets = {CORE: [], ELECTIVE: [], GRAD: []}
+    groups = {}
+    for number in sorted(pairs, key=pos.__getitem__):
+        kind = course_kind(catalog, number, met)
+        buckets[kind].extend(pairs[number])
+        if kind == CORE:
+            groups[number] = catalog.core_group[number]
+    return CandidatePool(
+        buckets[CORE],
+        buckets[ELECTIVE],
+        buckets[GRAD],
+        len(met),
+        groups,
+    )
+
+
+def candidate_pool(catalog, completed, busy):
+    """
+    Uncached pool for a set of completed course numbers and a busy mask,
+    eg. a future term in a multi-semester plan.
+    """
+    pairs = course_pairs(catalog, eligible_courses(catalog, completed), busy)
+    return pool_from_pairs(catalog, pairs, completed)
+
+
+class _Entry:
+    """
+    A cached pool and the inputs it was built from. `eligible` holds every
+    eligible course, `pairs` only those with an attendable section.
+    """
+
+    __slots__ = ("version", "completed", "busy", "eligible", "pairs", "pool")
+
+    def __init__(self, catalog, completed, busy):
+        self.version = catalog.version
+        self.completed = frozenset(completed)
+        self.busy = busy
+        self.eligible = eligible_courses(catalog, self.completed)
+        self.pairs = course_pairs(catalog, self.eligible, busy)
+        self.pool = None
+
+    def _positions(self, graph):
+        return {graph.pos[num] for num in self.completed if num in graph.pos}
+
+    def _set_eligible(self, catalog, number, eligible):
+        if eligible:
+            self.eligible.add(number)
+            # busy is None while waiting for set_busy to redo every section
+            if self.busy is not None:
+                found = attendable(catalog, number, self.busy)
+                if found:
+                    self.pairs[number] = found
+        else:
+            self.eligible.discard(number)
+            self.pairs.pop(number, None)
+
+    def add_completed(self, catalog, number):
+        """
+        Take `number` out of the pool and re-check the courses it unlocks.
+        """
+        graph = catalog.prereq_graph
+        self.completed = self.completed | {number}
+        self._set_eligible(catalog, number, False)
+        i = graph.pos.get(number)
+        if i is None:
+            return
+        done = self._positions(graph)
+        for d in graph.dependents[i]:
+            dependent = graph.numbers[d]
+            if dependent in self.completed or dependent in self.eligible:
+                continue
+            if graph.satisfied(d, done):
+                self._set_eligible(catalog, dependent, True)
+
+    def remove_completed(self, catalog, number):
+        """
+        Put `number` back if eligible and drop the courses that needed it.
+        """
+        graph = catalog.prereq_graph
+        self.completed = self.completed - {number}
+        i = graph.pos.get(number)
+        if i is None:
+            return
+        done = self._positions(graph)
+        self._set_eligible(catalog, number, graph.satisfied(i, done))
+        for d in graph.dependents[i]:
+            dependent = graph.numbers[d]
+            if dependent in self.eligible and not graph.satisfied(d, done):
+                self._set_eligible(catalog, dependent, False)
+
+    def set_busy(self, catalog, busy):
+        self.busy = busy
+        self.pairs = course_pairs(catalog, self.eligible, busy)
+
+
+class PoolCache:
+    """
+    LRU of candidate pools by user id.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "incremental": 0,
+            "refiltered": 0,
+            "evictions": 0,
+        }
+
+    def get(self, user_id, catalog, completed, busy):
+        """
+        The user's CandidatePool for these inputs, reusing what it can.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.version == catalog.version:
+                added = completed - entry.completed
+                removed = entry.completed - completed
+                if len(added) + len(removed) > MAX_INCREMENTAL:
+                    entry = None
+            else:
+                entry = None
+
+            if entry is None:
+                entry = _Entry(catalog, completed, busy)
+                self._entries[user_id] = entry
+                self.stats["misses"] += 1
+            elif added or removed or entry.busy != busy:
+                for number in removed:
+                    entry.remove_completed(catalog, number)
+                for number in added:
+                    entry.add_completed(catalog, number)
+                if entry.busy != busy:
+                    entry.set_busy(catalog, busy)
+                    self.stats["refiltered"] += 1
+                if added or removed:
+                    self.stats["incremental"] += 1
+                entry.pool = None
+            else:
+                self.stats["hits"] += 1
+
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            if entry.pool is None:
+                entry.pool = pool_from_pairs(catalog, entry.pairs, entry.completed)
+            return entry.pool
+
+    def _current(self, user_id, catalog):
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.version != catalog.version:
+            del self._entries[user_id]
+            return None
+        return entry
+
+    def completion_added(self, user_id, catalog, number):
+        with self._lock:
+            entry = self._current(user_id, catalog)
+            if entry is not None and number not in entry.completed:
+                entry.add_completed(catalog, number)
+                entry.pool = None
+                self.stats["incremental"] += 1
+
+    def completion_removed(self, user_id, catalog, number):
+        with self._lock:
+            entry = self._current(user_id, catalog)
+            if entry is not None and number in entry.completed:
+                entry.remove_completed(catalog, number)
+                entry.pool = None
+                self.stats["incremental"] += 1
+
+    def availability_changed(self, user_id):
+        """
+        Keep the eligible courses; sections are re-filtered on the next get.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.busy = None
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_pool_cache():
+    """
+    The app's candidate pool cache, or None outside an app context.
+    """
+    if not has_app_context():
+        return None
+    cache = current_app.extensions.get("pool_cache")
+    if cache is None:
+        cache = PoolCache(size=current_app.config.get("POOL_CACHE_SIZE", 1024))
+        current_app.extensions["pool_cache"] = cache
+    return cache
@@ -0,0 +1,325 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from flask import current_app
+from sqlalchemy import update
+from app.models import db, Course, CourseSection, CoursePrereq, CoreClass, CatalogState
+from .availability import get_resolution, occupancy_mask, parse_days
+from .prereqs import PrereqGraph, PrereqProgram
+from .time_index import SectionTimeIndex
+
+"""
+Read-only, in-memory index of the course catalog.
+
+The catalog only changes when the seeder runs, so instead of querying the
+course, section, prereq and core tables on every request we load them once
+into plain tuples and dicts and share that snapshot between requests.
+Each CatalogIndex carries the version stamp persisted in catalog_state,
+which the seeder bumps; other processes notice the new stamp within
+CATALOG_VERSION_CHECK seconds and rebuild. A rebuild swaps in a new index
+rather than mutating the old one, so readers holding a reference stay
+consistent.
+
+The index also memoizes serialized catalog responses (JSON and gzip bytes
+plus an ETag), so the catalog routes only walk the ORM once per version.
+"""
+
+# gzip level for cached catalog payloads (compressed once per version)
+GZIP_LEVEL = 6
+
+CachedPayload = namedtuple("CachedPayload", ["body", "gzipped", "etag"])
+CourseEntry = namedtuple("CourseEntry", ["number", "name", "description", "credits"])
+
+
+class SectionEntry(
+    namedtuple(
+        "SectionEntry",
+        [
+            "id",
+            "course_number",
+            "section",
+            "days",
+            "start_min",
+            "end_min",
+            "mask",
+            "pos",
+        ],
+    )
+):
+    """
+    Immutable copy of a CourseSection row plus its occupancy mask
+    (see app/availability.py) and its position in CatalogIndex.sections.
+    """
+
+    __slots__ = ()
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "course_number": self.course_number,
+            "section": self.section,
+            "days": self.days,
+            "start_min": self.start_min,
+            "end_min": self.end_min,
+        }
+
+
+class CatalogIndex:
+    """
+    Snapshot of courses, sections, prereq edges and the core requirements.
+    """
+
+    def __init__(
+        self,
+        version,
+        resolution,
+        courses,
+        sections,
+        prereqs,
+        core,
+        prereq_trees=None,
+        core_groups=None,
+    ):
+        self.version = version
+        # slot size the section masks were built with
+        self.resolution = resolution
+        # number -> CourseEntry, in table order
+        self.courses = courses
+        # all sections, in table order
+        self.sections = tuple(sections)
+        # number -> frozenset of prereq numbers
+        self.prereqs = prereqs
+        # core requirements, each met by any one of its courses; by default
+        # every core course is a requirement of its own
+        if core_groups is None:
+            core_groups = [[num] for num in core]
+        self.core_groups = tuple(frozenset(group) for group in core_groups)
+        self.core = frozenset(core).union(*self.core_groups)
+        # core number -> index of its requirement in core_groups
+        self.core_group = {
+            num: g for g, group in enumerate(self.core_groups) for num in group
+        }
+        # compiled requirement trees; courses without one need all prereqs
+        self.requirements = PrereqProgram.compile(
+            self.courses, prereq_trees or {}, self.prereqs
+        )
+
+        by_course = {}
+        for sec in self.sections:
+            by_course.setdefault(sec.course_number, []).append(sec)
+        self.sections_by_course = {num: tuple(s) for num, s in by_course.items()}
+        self.section_by_id = {sec.id: sec for sec in self.sections}
+        # conflicts[sec.pos] has bit j set when sections[j] overlaps sec
+        self.conflicts = build_conflicts(self.sections)
+        self._payloads = {}
+        self._payload_lock = threading.Lock()
+        self._derived = {}
+
+    def derived(self, key, build):
+        """
+        Memoize a structure computed from this index (eg. the prerequisite
+        graph); build(self) runs at most a few times, once per racing caller.
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived.setdefault(key, build(self))
+        return value
+
+    @property
+    def prereq_graph(self):
+        return self.derived(
+            "prereq_graph",
+            lambda index: PrereqGraph(index.requirements, index.core_groups),
+        )
+
+    @property
+    def time_index(self):
+        return self.derived(
+            "time_index",
+            lambda index: SectionTimeIndex(index.sections, index.resolution),
+        )
+
+    def payload(self, key, build):
+        """
+        Cached response body for `key`. build() returns the JSON data and is
+        only called the first time a key is requested for this index.
+        """
+        cached = self._payloads.get(key)
+        if cached is None:
+            cached = encode_payload(build(), self.version)
+            with self._payload_lock:
+                cached = self._payloads.setdefault(key, cached)
+        return cached
+
+    @classmethod
+    def build(cls, version):
+        """
+        Load the whole catalog with one query per table.
+        """
+        resolution = get_resolution()
+        courses, prereq_trees = {}, {}
+        for row in db.session.query(
+            Course.number,
+            Course.name,
+            Course.description,
+            Course.credits,
+            Course.prereq_tree,
+        ):
+            courses[row.number] = CourseEntry(*row[:4])
+            if row.prereq_tree:
+                prereq_trees[row.number] = json.loads(row.prereq_tree)
+        sections = [
+            SectionEntry(*row, occupancy_mask(row, resolution), pos)
+            for pos, row in enumerate(
+                db.session.query(
+                    CourseSection.id,
+                    CourseSection.course_number,
+                    CourseSection.section,
+                    CourseSection.days,
+                    CourseSection.start_min,
+                    CourseSection.end_min,
+                ).order_by(CourseSection.id)
+            )
+        ]
+        edges = {}
+        for course_number, prereq_number in db.session.query(
+            CoursePrereq.course_number, CoursePrereq.prereq_number
+        ):
+            edges.setdefault(course_number, set()).add(prereq_number)
+        prereqs = {num: frozenset(p) for num, p in edges.items()}
+        groups = {}
+        for number, requirement in db.session.query(
+            CoreClass.course_number, CoreClass.requirement
+        ):
+            groups.setdefault(requirement or number, []).append(number)
+        core = [num for group in groups.values() for num in group]
+        return cls(
+            version,
+            resolution,
+            courses,
+            sections,
+            prereqs,
+            core,
+            prereq_trees,
+            core_groups=list(groups.values()),
+        )
+
+
+def encode_payload(data, version):
+    """
+    Serialize data once, as plain and gzip-compressed bytes. The ETag combines
+    the catalog version with a hash of the body.
+    """
+    body = json.dumps(data).encode()
+    digest = hashlib.sha1(body).hexdigest()[:16]
+    return CachedPayload(
+        body, gzip.compress(body, compresslevel=GZIP_LEVEL), f"{version}-{digest}"
+    )
+
+
+def build_conflicts(sections):
+    """
+    Pairwise conflict bitsets: bit j of conflicts[i] is set when sections i and
+    j meet on a shared day at overlapping times. Each day's meetings are kept
+    in numpy arrays sorted by start time, so a section's overlaps on a day are
+    a searchsorted and one vectorized end-time test, and its bitset is packed
+    once from a boolean row instead of OR-ing a wide int per overlapping pair.
+    Meetings with no length overlap nothing, like their occupancy masks.
+    """
+    timed = [
+        sec
+        for sec in sections
+        if sec.start_min is not None
+        and sec.end_min is not None
+        and sec.end_min > sec.start_min
+    ]
+    by_day = {}
+    for sec in timed:
+        for day in set(parse_days(sec.days)):
+            by_day.setdefault(day, []).append(sec)
+    days = {}
+    for day, members in by_day.items():
+        members.sort(key=lambda sec: sec.start_min)
+        days[day] = (
+            np.array([sec.start_min for sec in members]),
+            np.array([sec.end_min for sec in members]),
+            np.array([sec.pos for sec in members]),
+        )
+
+    conflicts = [0] * len(sections)
+    row = np.zeros(len(sections), dtype=bool)
+    for sec in timed:
+        top = 0
+        for day in set(parse_days(sec.days)):
+            starts, ends, positions = days[day]
+            k = np.searchsorted(starts, sec.end_min)
+            hits = positions[:k][ends[:k] > sec.start_min]
+            row[hits] = True
+            top = max(top, int(hits.max()) + 1)
+        # every hit list contains the section itself
+        row[sec.pos] = False
+        conflicts[sec.pos] = int.from_bytes(
+            np.packbits(row[:top], bitorder="little").tobytes(), "little"
+        )
+        row[:top] = False
+    return conflicts
+
+
+_lock = threading.Lock()
+
+
+def read_catalog_version():
+    """
+    The persisted catalog version stamp (0 before the first seed).
+    """
+    version = db.session.query(CatalogState.version).filter_by(id=1).scalar()
+    return version or 0
+
+
+def bump_catalog_version():
+    """
+    Increment the persisted version stamp. Call after changing catalog tables.
+    """
+    now = time.time()
+    bumped = db.session.execute(
+        update(CatalogState)
+        .where(CatalogState.id == 1)
+        .values(version=CatalogState.version + 1, updated_at=now)
+    ).rowcount
+    if not bumped:
+        db.session.add(CatalogState(id=1, version=1, updated_at=now))
+    db.session.commit()
+    return read_catalog_version()
+
+
+def get_catalog():
+    """
+    Return the current catalog index, building it on first use and
+    rebuilding it when another process has bumped the version stamp.
+    """
+    catalog = current_app.extensions.get("catalog_index")
+    if catalog is None:
+        return rebuild_catalog()
+    interval = current_app.config.get("CATALOG_VERSION_CHECK", 5)
+    now = time.monotonic()
+    if now - current_app.extensions.get("catalog_checked_at", 0) >= interval:
+        current_app.extensions["catalog_checked_at"] = now
+        if read_catalog_version() != catalog.version:
+            catalog = rebuild_catalog()
+    return catalog
+
+
+def rebuild_catalog():
+    """
+    Reload the catalog from the database and swap in a new index.
+    Call this whenever the catalog tables change (eg. after seeding).
+    """
+    with _lock:
+        catalog = CatalogIndex.build(read_catalog_version())
+        current_app.extensions["catalog_index"] = catalog
+        current_app.extensions["catalog_checked_at"] = time.monotonic()
+    return catalog
@@ -0,0 +1,264 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from . import metrics
+from .availability import busy_mask, user_free_mask
+from .candidates import candidate_pool, get_pool_cache
+from .catalog import get_catalog
+from .gpt import apply_ranking
+from .ranker import rank_courses
+from .ranking_cache import normalize_interests
+from .schedule_store import save_schedules
+from .solver import CORE, ELECTIVE, GRAD, Candidate, solve_top_k
+
+"""
+Schedule generation: builds the pool of courses and sections a user can take,
+ranks the electives and hands the scored candidates to the solver.
+"""
+
+MAX_COURSES = 5
+MAX_CORE = 3
+MAX_ALTERNATIVES = 10
+# How many top schedules to search per requested alternative
+DIVERSITY_POOL_FACTOR = 8
+
+# Scoring: cores first, then electives by rank (between 1 and 2), then grad
+CORE_SCORE = 3.0
+ELECTIVE_SCORE = 1.0
+GRAD_SCORE = 1.0
+
+NO_SECTIONS = "No available course sections match your schedule."
+
+RATIONALE = (
+    "Best conflict-free schedule: core classes first, then ranked electives, "
+    "then grad-level if eligible."
+)
+
+
+def build_candidate_pool(user, catalog):
+    """
+    Bucket every section the user is eligible for and free to attend,
+    through the per-user pool cache when there is an app context.
+    """
+    completed = frozenset(c.course_number for c in user.completed_courses)
+    resolution = catalog.resolution
+    busy = busy_mask(user_free_mask(user, resolution), resolution)
+    cache = get_pool_cache()
+    if cache is None:
+        return candidate_pool(catalog, completed, busy)
+    return cache.get(user.id, catalog, completed, busy)
+
+
+def _group(pairs):
+    """
+    Collapse (course, section) pairs into [(course, [sections])] in order.
+    """
+    grouped = {}
+    for course, section in pairs:
+        grouped.setdefault(course.number, (course, []))[1].append(section)
+    return list(grouped.values())
+
+
+def score_candidates(pool, ranked_electives, bonus=None):
+    """
+    Turn a candidate pool into scored solver candidates.
+    `ranked_electives` is the elective (course, section) pairs in ranked order.
+    `bonus` optionally maps course numbers to extra score.
+    """
+    bonus = bonus or {}
+    candidates = []
+    for course, sections in _group(pool.core):
+        score = CORE_SCORE + bonus.get(course.number, 0)
+        group = pool.core_groups[course.number]
+        candidates.append(Candidate(course, CORE, score, sections, group))
+
+    electives = _group(ranked_electives)
+    for rank, (course, sections) in enumerate(electives):
+        score = ELECTIVE_SCORE + (len(electives) - rank) / len(electives)
+        score += bonus.get(course.number, 0)
+        candidates.append(Candidate(course, ELECTIVE, score, sections))
+
+    if pool.num_core_completed >= MAX_CORE:
+        for course, sections in _group(pool.grad):
+            score = GRAD_SCORE + bonus.get(course.number, 0)
+            candidates.append(Candidate(course, GRAD, score, sections))
+    return candidates
+
+
+def rank_electives(pool, interests, ranker=None):
+    """
+    Order the elective pairs by the user's interests.
+    """
+    if not pool.elective:
+        return []
+    return rank_courses(pool.elective, interests, len(pool.elective), mode=ranker)
+
+
+def solve_pool(
+    catalog, pool, ranked_electives, count=1, budget_ms=None, max_core=None, bonus=None
+):
+    """
+    Search a ranked candidate pool and return up to `count` diverse schedules.
+    Needs no app context, so it can run on worker threads. `max_core`
+    overrides the core course limit and `bonus` is passed to score_candidates.
+    """
+    k = count if count == 1 else count * DIVERSITY_POOL_FACTOR
+    if max_core is None:
+        max_core = max(MAX_CORE - pool.num_core_completed, 0)
+    result = solve_top_k(
+        score_candidates(pool, ranked_electives, bonus),
+        catalog.conflicts,
+        k=k,
+        max_courses=MAX_COURSES,
+        max_core=max_core,
+        budget_ms=budget_ms,
+    )
+    return pick_diverse(result.solutions, count)
+
+
+def pick_diverse(solutions, count):
+    """
+    Choose `count` schedules from a ranked list, starting with the best and
+    then repeatedly taking the one sharing the fewest courses with those
+    already picked (ties go to the higher score).
+    """
+    if len(solutions) <= count:
+        return list(solutions)
+    course_sets = [{sec.course_number for sec in s.sections} for s in solutions]
+    picked = [0]
+    while len(picked) < count:
+        best, best_overlap = None, None
+        for i in range(len(solutions)):
+            if i in picked:
+                continue
+            overlap = max(len(course_sets[i] & course_sets[j]) for j in picked)
+            if best_overlap is None or overlap < best_overlap:
+                best, best_overlap = i, overlap
+        picked.append(best)
+    return [solutions[i] for i in picked]
+
+
+def generate_for_user(user, count=1, ranker=None):
+    """
+    Return up to `count` diverse schedules for a user, best first, or None if
+    no section matches their eligibility and availability. The candidate pool
+    and elective ranking are computed once and shared by every alternative.
+    """
+    with metrics.stage("load"):
+        catalog = get_catalog()
+    with metrics.stage("filter"):
+        pool = build_candidate_pool(user, catalog)
+    if not (pool.core or pool.elective or pool.grad):
+        return None
+    with metrics.stage("rank"):
+        ranked = rank_electives(pool, user.interests, ranker)
+    with metrics.stage("solve"):
+        return solve_pool(
+            catalog,
+            pool,
+            ranked,
+            count=count,
+            budget_ms=current_app.config.get("SCHEDULE_SEARCH_BUDGET_MS"),
+        )
+
+
+def generate_and_save(user, count=1, ranker=None):
+    """
+    Generate schedules for a user and save them in one transaction, reusing
+    any the user already has. Returns their payloads, or None if no section
+    matches the user.
+    """
+    solutions = generate_for_user(user, count=count, ranker=ranker)
+    if solutions is None:
+        return None
+    with metrics.stage("persist"):
+        schedule_ids = save_solutions({user.id: solutions})[user.id]
+    return schedule_payloads(user.id, schedule_ids, solutions)
+
+
+def generate_for_users(users, count=1, ranker=None, workers=4):
+    """
+    Batch version of generate_for_user.
+
+    The catalog is loaded once and users whose interests and elective
+    candidates are identical share one ranking call. Ranking calls (network
+    bound for GPT) run on a thread pool; the CPU-bound solves run one after
+    another, so each gets its whole time budget instead of sharing the GIL
+    with the others while its clock runs. Returns
+    ({user_id: (solutions or None, solve_ms)}, stats).
+    """
+    app = current_app._get_current_object()
+    budget_ms = app.config.get("SCHEDULE_SEARCH_BUDGET_MS")
+    timing = {}
+
+    start = time.perf_counter()
+    catalog = get_catalog()
+    pools = {user.id: build_candidate_pool(user, catalog) for user in users}
+    timing["pool_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    groups = {}
+    for user in users:
+        pool = pools[user.id]
+        if pool.elective:
+            key = (
+                normalize_interests(user.interests or ""),
+                frozenset(course.number for course, _ in pool.elective),
+            )
+            groups.setdefault(key, []).append(user)
+
+    def rank_group(members):
+        with app.app_context():
+            first = members[0]
+            ranked = rank_electives(pools[first.id], first.interests, ranker)
+            return list(dict.fromkeys(course.number for course, _ in ranked))
+
+    def solve(user):
+        pool = pools[user.id]
+        if not (pool.core or pool.elective or pool.grad):
+            return None, 0.0
+        solve_start = time.perf_counter()
+        ranked = apply_ranking(pool.elective, ranked_numbers.get(user.id, ()))
+        solutions = solve_pool(catalog, pool, ranked, count=count, budget_ms=budget_ms)
+        return solutions, (time.perf_counter() - solve_start) * 1000
+
+    ranked_numbers = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for members, numbers in zip(
+            groups.values(), executor.map(rank_group, groups.values())
+        ):
+            for user in members:
+                ranked_numbers[user.id] = numbers
+    timing["rank_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = {user.id: solve(user) for user in users}
+    timing["solve_ms"] = (time.perf_counter() - start) * 1000
+
+    return results, {"ranking_calls": len(groups), "timing": timing}
+
+
+def save_solutions(solutions_by_user):
+    """
+    Save {user_id: [Solution]} in one transaction and return
+    {user_id: [schedule id per solution]}. A solution with the same sections
+    as one of the user's schedules reuses that schedule.
+    """
+    return save_schedules(solutions_by_user, RATIONALE)
+
+
+def schedule_payloads(user_id, schedule_ids, solutions):
+    """
+    Serialize saved schedules from their solutions, using the catalog
+    sections instead of loading the rows back.
+    """
+    return [
+        {
+            "id": schedule_id,
+            "user_id": user_id,
+            "rationale": RATIONALE,
+            "score": solution.score,
+            "sections": [sec.serialize() for sec in solution.sections],
+        }
+        for schedule_id, solution in zip(schedule_ids, solutions)
+    ]
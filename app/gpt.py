@@ -1,39 +1,164 @@
-import re
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from openai import OpenAI
+from . import metrics
+from .ranking_cache import get_ranking_cache, ranking_key
 
-client = OpenAI()
+# Seconds the request thread waits for a ranking before using the fallback
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 5))
+# Seconds before a second, hedged request is sent (unset disables hedging)
+LLM_HEDGE_AFTER = (
+    float(os.environ["LLM_HEDGE_AFTER"]) if os.environ.get("LLM_HEDGE_AFTER") else None
+)
+LLM_MAX_WORKERS = int(os.environ.get("LLM_MAX_WORKERS", 8))
+# Consecutive failures that open the breaker, and seconds it stays open
+LLM_BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", 30))
+
+client = None
+executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+
+
+def get_client():
+    """
+    OpenAI client, created on first use so importing the app needs no key.
+    Its own timeout is a little over the deadline so stray calls finish.
+    """
+    global client
+    if client is None:
+        client = OpenAI(timeout=LLM_DEADLINE * 2, max_retries=0)
+    return client
+
+
+class CircuitBreaker:
+    """
+    Skips the LLM while it is unhealthy.
+
+    After `threshold` consecutive failures the breaker opens and every call
+    is refused for `cooldown` seconds. Then a single trial call is let
+    through: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+
+
+def apply_ranking(courses, ranked_numbers):
+    """
+    Order (course, section) pairs by a ranked list of course numbers.
+    Pairs whose course was not ranked keep their order at the end.
+    """
+    by_number = {}
+    for pair in courses:
+        by_number.setdefault(pair[0].number, []).append(pair)
+
+    ranked = []
+    for num in ranked_numbers:
+        ranked.extend(by_number.pop(num, ()))
+
+    for pair in courses:
+        if pair[0].number in by_number:
+            ranked.append(pair)
+    return ranked
 
 
 def gpt_rank_courses(courses, interests, remaining_slots):
     """
     Uses OpenAI's GPT to rank elective CS courses for a student based on their interests.
+    Rankings are cached by interests and candidate set (see app/ranking_cache.py).
     """
     if not interests or len(courses) <= 1:
         return courses[:remaining_slots]
+
+    cache = get_ranking_cache()
+    key = ranking_key(interests, [course.number for course, _ in courses])
+    ranked_numbers = cache.get(key) if cache is not None else None
+    if ranked_numbers is None:
+        ranked_numbers = ask_gpt(courses, interests)
+        if ranked_numbers is None:
+            return courses[:remaining_slots]
+        if cache is not None:
+            cache.put(key, ranked_numbers)
+
+    return apply_ranking(courses, ranked_numbers)[:remaining_slots]
+
+
+def build_prompt(courses, interests):
+    """
+    Prompt asking GPT to rank the candidate courses for these interests.
+    """
+    return f"""
+        You are a course advisor helping a CS undergraduate student plan their next semester.
+        The student is interested in: {interests}
+
+        Please prioritize the following when ranking courses:
+        - Electives that are **closely related to the student's interests** (based on course title).
+        - **Higher-level CS courses** (typically 4000+), assuming prerequisites are met.
+        - Avoid course conflicts and follow all rules below.
+
+        Rules & Assumptions:
+        - The student has completed all non-CS prerequisites (e.g., Math or Engineering requirements).
+        - The student may only take **one of each course pair**: CS 1110 or CS 1112, CS 2110 or CS 2112, CS 2800 or CS 2802, CS 3410 or CS 3420, CS 3700 or CS 3780, CS 4410 or CS 4414.
+        - If both are available, choose the **non-honors/default version** (e.g., prefer CS 2110 over 2112, CS 2800 over 2802).
+        - CS 3110 should not be taken concurrently with CS 3410 or 3420.
+        - CS 3110 requires CS 2110 and CS 2800 (2800 can be a corequisite).
+        - CS 3700 requires CS 2110 and CS 2800 as prerequisites.
+        - CS 4410 requires CS 3410 or CS 3420.
+        - Rank only the unique courses (avoid suggesting multiple sections of the same course).
+        Courses to rank:
+        {', '.join([course.number + ' - ' + course.name for course, _ in courses])}
+        Respond with a comma-separated list of course numbers only in ranked order.
+        """
+
+
+def request_ranking(prompt):
+    """
+    One blocking ranking call. Raises on any API or network error.
+    """
+    start = time.perf_counter()
     try:
-        prompt = f"""
-            You are a course advisor helping a CS undergraduate student plan their next semester.
-            The student is interested in: {interests}
-
-            Please prioritize the following when ranking courses:
-            - Electives that are **closely related to the student's interests** (based on course title).
-            - **Higher-level CS courses** (typically 4000+), assuming prerequisites are met.
-            - Avoid course conflicts and follow all rules below.
-
-            Rules & Assumptions:
-            - The student has completed all non-CS prerequisites (e.g., Math or Engineering requirements).
-            - The student may only take **one of each course pair**: CS 1110 or CS 1112, CS 2110 or CS 2112, CS 2800 or CS 2802, CS 3410 or CS 3420, CS 3700 or CS 3780, CS 4410 or CS 4414.
-            - If both are available, choose the **non-honors/default version** (e.g., prefer CS 2110 over 2112, CS 2800 over 2802).
-            - CS 3110 should not be taken concurrently with CS 3410 or 3420.
-            - CS 3110 requires CS 2110 and CS 2800 (2800 can be a corequisite).
-            - CS 3700 requires CS 2110 and CS 2800 as prerequisites.
-            - CS 4410 requires CS 3410 or CS 3420.
-            - Rank only the unique courses (avoid suggesting multiple sections of the same course).
-            Courses to rank:
-            {', '.join([course.number + ' - ' + course.name for course, _ in courses])}
-            Respond with a comma-separated list of course numbers only in ranked order.
-            """
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-3.5-turbo",  # Changed to more reliable model
             messages=[
                 {
@@ -44,22 +169,58 @@ def gpt_rank_courses(courses, interests, remaining_slots):
             ],
             temperature=0.3,
         )
+    except Exception:
+        metrics.LLM_SECONDS.observe(time.perf_counter() - start, "error")
+        raise
+    metrics.LLM_SECONDS.observe(time.perf_counter() - start, "ok")
 
-        ranked_numbers = response.choices[0].message.content.split(",")
-        ranked_numbers = [c.strip() for c in ranked_numbers if c.strip()]
+    ranked_numbers = response.choices[0].message.content.split(",")
+    return [c.strip() for c in ranked_numbers if c.strip()]
 
-        ranked = []
-        for num in ranked_numbers:
-            for pair in courses:
-                if pair[0].number == num and pair not in ranked:
-                    ranked.append(pair)
 
-        for pair in courses:
-            if pair not in ranked:
-                ranked.append(pair)
+def ask_gpt(courses, interests):
+    """
+    Ask GPT for a ranked list of course numbers, or None if the call fails,
+    misses its deadline or the circuit breaker is open.
 
-        return ranked[:remaining_slots]
+    The call runs on a worker thread so the request thread only waits until
+    LLM_DEADLINE. With LLM_HEDGE_AFTER set, a second identical request is sent
+    if the first has not answered by then, and whichever finishes first wins.
+    """
+    if not breaker.allow():
+        metrics.LLM_RANKINGS.inc("circuit_open")
+        print("GPT Error: circuit open, using fallback ordering")
+        return None
 
-    except Exception as e:
-        print(f"GPT Error: {e}")
-        return courses[:remaining_slots]
+    prompt = build_prompt(courses, interests)
+    deadline = time.monotonic() + LLM_DEADLINE
+    pending = {executor.submit(request_ranking, prompt)}
+    if LLM_HEDGE_AFTER is not None and LLM_HEDGE_AFTER < LLM_DEADLINE:
+        done, _ = wait(pending, timeout=LLM_HEDGE_AFTER)
+        if not done:
+            pending.add(executor.submit(request_ranking, prompt))
+
+    error = None
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                ranked_numbers = future.result()
+            except Exception as e:
+                error = e
+                continue
+            breaker.record_success()
+            metrics.LLM_RANKINGS.inc("ok")
+            return ranked_numbers
+
+    breaker.record_failure()
+    if pending:
+        metrics.LLM_RANKINGS.inc("timeout")
+        print(f"GPT Error: no answer within {LLM_DEADLINE}s")
+    else:
+        metrics.LLM_RANKINGS.inc("error")
+        print(f"GPT Error: {error}")
+    return None
@@ -0,0 +1,222 @@
+import json
+import multiprocessing
+import threading
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_, update
+from app.models import db, User, GenerationJob
+from .generator import NO_SECTIONS, generate_and_save
+
+"""
+Background schedule generation.
+
+POST /schedules/generate/ with "async": true stores a GenerationJob row and
+returns right away. A pool of workers (threads in the web process, or
+separate processes) claims queued jobs from the table, runs the same
+generation code as the synchronous route and stores the result on the row.
+Because the queue is the database, queued work survives a restart; a job
+left "running" by a worker that died is picked up again once its lease
+(JOB_LEASE_SECONDS) expires.
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Longest wait, in seconds, after repeated worker errors
+MAX_ERROR_BACKOFF = 60
+
+
+def enqueue_generation(user_id, body):
+    """
+    Store a generation request and wake the workers.
+    """
+    job = GenerationJob(
+        user_id=user_id,
+        payload=json.dumps(body),
+        status=QUEUED,
+        created_at=time.time(),
+    )
+    db.session.add(job)
+    db.session.commit()
+    app = current_app._get_current_object()
+    if app.config["JOB_WORKERS"] > 0:
+        start_workers(app).wake.set()
+    return job
+
+
+def claim_next_job(lease_seconds):
+    """
+    Atomically mark the oldest runnable job as running and return its id,
+    or None if there is nothing to do.
+    """
+    now = time.time()
+    runnable = or_(
+        GenerationJob.status == QUEUED,
+        (GenerationJob.status == RUNNING)
+        & (GenerationJob.started_at < now - lease_seconds),
+    )
+    candidates = (
+        db.session.query(GenerationJob.id, GenerationJob.status)
+        .filter(runnable)
+        .order_by(GenerationJob.id)
+        .limit(8)
+        .all()
+    )
+    for job_id, status in candidates:
+        claimed = db.session.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id, GenerationJob.status == status)
+            .where(runnable)
+            .values(status=RUNNING, started_at=now)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def run_job(job_id):
+    """
+    Run one claimed job and store its result or error.
+    """
+    job = db.session.get(GenerationJob, job_id)
+    body = json.loads(job.payload)
+    try:
+        user = db.session.get(User, job.user_id)
+        if user is None:
+            raise LookupError("User not found")
+        payloads = generate_and_save(
+            user, count=body.get("count", 1), ranker=body.get("ranker")
+        )
+        if payloads is None:
+            raise LookupError(NO_SECTIONS)
+        result = payloads[0] if "count" not in body else {"schedules": payloads}
+        job.status, job.result = DONE, json.dumps(result)
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(GenerationJob, job_id)
+        job.status = FAILED
+        job.error = str(e) if isinstance(e, LookupError) else repr(e)
+    job.finished_at = time.time()
+    db.session.commit()
+
+
+def worker_loop(app, stop, wake=None):
+    """
+    Claim and run jobs until `stop` is set, sleeping between empty polls.
+    """
+    poll = app.config["JOB_POLL_INTERVAL"]
+    lease = app.config["JOB_LEASE_SECONDS"]
+    errors = 0
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                job_id = claim_next_job(lease)
+                if job_id is not None:
+                    run_job(job_id)
+            except Exception as e:
+                # eg. the database is unreachable; a job claimed before the
+                # error is picked up again when its lease expires
+                db.session.rollback()
+                errors += 1
+                delay = min(poll * 2**errors, MAX_ERROR_BACKOFF)
+                print(f"Job worker error: {e!r}, retrying in {delay:g}s")
+                stop.wait(delay)
+                continue
+            errors = 0
+            if job_id is not None:
+                continue
+        if wake is not None:
+            wake.wait(poll)
+            wake.clear()
+        else:
+            stop.wait(poll)
+
+
+def _process_main(stop):
+    from app import create_app
+
+    worker_loop(create_app(), stop)
+
+
+class JobQueue:
+    """
+    The worker pool for one app: JOB_WORKERS threads or processes
+    (JOB_WORKER_MODE).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.mode = app.config["JOB_WORKER_MODE"]
+        self.size = app.config["JOB_WORKERS"]
+        self.wake = threading.Event()
+        self.workers = []
+        if self.mode == "process":
+            self.context = multiprocessing.get_context("spawn")
+            self.stop = self.context.Event()
+        else:
+            self.stop = threading.Event()
+
+    def start(self):
+        for i in range(self.size):
+            if self.mode == "process":
+                worker = self.context.Process(
+                    target=_process_main, args=(self.stop,), daemon=True
+                )
+            else:
+                worker = threading.Thread(
+                    target=worker_loop,
+                    args=(self.app, self.stop, self.wake),
+                    name=f"job-worker-{i}",
+                    daemon=True,
+                )
+            worker.start()
+            self.workers.append(worker)
+
+    def shutdown(self):
+        self.stop.set()
+        self.wake.set()
+        for worker in self.workers:
+            worker.join()
+
+
+_start_lock = threading.Lock()
+
+
+def start_workers(app):
+    """
+    Start the app's worker pool if it is not running yet.
+    """
+    with _start_lock:
+        queue = app.extensions.get("job_queue")
+        if queue is None:
+            queue = JobQueue(app)
+            queue.start()
+            app.extensions["job_queue"] = queue
+    return queue
+
+
+def init_app(app):
+    """
+    Start the workers with the first request the app serves, so jobs left
+    in the queue by a previous run are picked up without starting workers
+    in CLI commands like seed-all.
+    """
+
+    @app.before_request
+    def _ensure_job_workers():
+        if "job_queue" not in app.extensions and app.config["JOB_WORKERS"] > 0:
+            start_workers(app)
+
+
+@click.command("run-jobs")
+@with_appcontext
+def run_jobs():
+    """
+    Run a job worker in the foreground (for JOB_WORKERS=0 deployments).
+    """
+    worker_loop(current_app._get_current_object(), threading.Event())
@@ -0,0 +1,256 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+
+"""
+Request metrics in the Prometheus text format, served at /metrics.
+
+Per request the hooks below record latency by endpoint, and how many SQL
+statements the request ran and how long they took (counted by engine
+events into a thread-local, so other threads' queries are not charged to
+it). gpt.py records every LLM request and ranking outcome, and the
+generator times the stages of schedule generation. Cache counters are
+read from the caches when /metrics is scraped.
+
+Recording a value is a bisect and a few additions under a lock, so the
+hooks cost microseconds per request. Metrics live in this process only;
+with several processes (eg. gunicorn workers) each exports its own.
+Streamed responses are timed until their first byte.
+"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """
+    A running total per label combination.
+    """
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative buckets per label combination, plus sum and count.
+    """
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(
+                (labels, list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            )
+        names = self.labels + ("le",)
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, labels + (bound,))} "
+                    f"{cumulative}"
+                )
+            suffix = _labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "schedulr_http_request_duration_seconds",
+    "Time to handle a request.",
+    ("method", "endpoint"),
+)
+REQUESTS = Counter(
+    "schedulr_http_requests_total",
+    "Requests handled, by response status.",
+    ("method", "endpoint", "status"),
+)
+REQUEST_SQL_QUERIES = Histogram(
+    "schedulr_http_request_sql_queries",
+    "SQL statements run by one request.",
+    ("endpoint",),
+    COUNT_BUCKETS,
+)
+REQUEST_SQL_SECONDS = Histogram(
+    "schedulr_http_request_sql_seconds",
+    "Time one request spent in SQL statements.",
+    ("endpoint",),
+)
+SQL_QUERIES = Counter(
+    "schedulr_sql_queries_total", "SQL statements run by this process."
+)
+SQL_SECONDS = Counter(
+    "schedulr_sql_seconds_total", "Time this process spent in SQL statements."
+)
+LLM_SECONDS = Histogram(
+    "schedulr_llm_request_duration_seconds",
+    "Latency of each LLM API request, including hedged ones.",
+    ("outcome",),
+)
+LLM_RANKINGS = Counter(
+    "schedulr_llm_rankings_total",
+    "LLM rankings asked for, by outcome (ok, error, timeout, circuit_open).",
+    ("outcome",),
+)
+GENERATE_STAGE_SECONDS = Histogram(
+    "schedulr_generate_stage_seconds",
+    "Time spent in each stage of schedule generation.",
+    ("path", "stage"),
+)
+
+METRICS = [
+    REQUEST_SECONDS,
+    REQUESTS,
+    REQUEST_SQL_QUERIES,
+    REQUEST_SQL_SECONDS,
+    SQL_QUERIES,
+    SQL_SECONDS,
+    LLM_SECONDS,
+    LLM_RANKINGS,
+    GENERATE_STAGE_SECONDS,
+]
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name, path="single"):
+    """
+    Time a block as one generation stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        GENERATE_STAGE_SECONDS.observe(time.perf_counter() - start, path, name)
+
+
+def observe_stages(stages_ms, path):
+    """
+    Record stage timings measured elsewhere, as {stage: milliseconds}.
+    """
+    for name, ms in stages_ms.items():
+        GENERATE_STAGE_SECONDS.observe(ms / 1000, path, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    SQL_QUERIES.inc()
+    SQL_SECONDS.inc(amount=elapsed)
+    current = getattr(_local, "sql", None)
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    _local.sql = [0, 0.0]
+
+
+def _after_request(response):
+    start = g.pop("metrics_start", None)
+    sql = getattr(_local, "sql", None)
+    _local.sql = None
+    if start is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, endpoint)
+    REQUESTS.inc(request.method, endpoint, response.status_code)
+    if sql is not None:
+        REQUEST_SQL_QUERIES.observe(sql[0], endpoint)
+        REQUEST_SQL_SECONDS.observe(sql[1], endpoint)
+    return response
+
+
+def render(caches=None):
+    """
+    Every metric in the Prometheus text format. `caches` maps a cache name
+    to its stats dict (eg. RankingCache.stats), exported as counters.
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.append("# HELP schedulr_cache_events_total Cache lookups and evictions.")
+    lines.append("# TYPE schedulr_cache_events_total counter")
+    for name, stats in sorted((caches or {}).items()):
+        for key, value in sorted(stats.items()):
+            lines.append(
+                f"schedulr_cache_events_total"
+                f"{_labels(('cache', 'event'), (name, key))} {value}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, engine):
+    """
+    Install the request hooks and the SQL listeners on `engine`, unless
+    METRICS_ENABLED is off.
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -4,6 +4,9 @@ from .course import Course
 from .section import CourseSection
 from .schedule import GeneratedSchedule, ScheduleSection
 from .association import CompletedCourse, CoursePrereq, CoreClass
+from .cache import RankingCacheEntry
+from .job import GenerationJob
+from .catalog_state import CatalogState
 
 __all__ = [
     "db",
@@ -15,4 +18,7 @@ __all__ = [
     "CompletedCourse",
     "CoursePrereq",
     "CoreClass",
+    "RankingCacheEntry",
+    "GenerationJob",
+    "CatalogState",
 ]
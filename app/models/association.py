@@ -11,7 +11,11 @@ class CompletedCourse(db.Model):
         db.Integer, db.ForeignKey("user.id"), primary_key=True, nullable=False
     )
     course_number = db.Column(
-        db.String, db.ForeignKey("course.number"), primary_key=True, nullable=False
+        db.String,
+        db.ForeignKey("course.number"),
+        primary_key=True,
+        nullable=False,
+        index=True,
     )
 
     course = db.relationship("Course", lazy=True)
@@ -40,8 +44,10 @@ class CoursePrereq(db.Model):
     course_number = db.Column(
         db.String, db.ForeignKey("course.number"), primary_key=True, nullable=False
     )
+    # Not a foreign key: prerequisites may name courses outside the catalog
+    # (eg. "MATH 1920" in a CS-only roster), which count as satisfied
     prereq_number = db.Column(
-        db.String, db.ForeignKey("course.number"), primary_key=True, nullable=False
+        db.String, primary_key=True, nullable=False, index=True
     )
 
     def __init__(self, **kwargs):
@@ -63,16 +69,22 @@ class CoursePrereq(db.Model):
 
 class CoreClass(db.Model):
     """
-    Table for core classes a student must take.
+    Table for core classes a student must take. Rows sharing a requirement
+    are alternatives (eg. CS 1110 or CS 1112): any one of them meets it.
     """
 
     __tablename__ = "core_class"
     course_number = db.Column(
         db.String, db.ForeignKey("course.number"), nullable=False, primary_key=True
     )
+    # requirement name; NULL counts as a requirement of its own
+    requirement = db.Column(db.String, nullable=True)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
     def serialize(self):
-        return {"course_number": self.course_number}
+        return {
+            "course_number": self.course_number,
+            "requirement": self.requirement or self.course_number,
+        }
@@ -0,0 +1,22 @@
+from .base import db
+
+
+class RankingCacheEntry(db.Model):
+    """
+    Persisted elective ranking, keyed by interests and candidate courses.
+    """
+
+    __tablename__ = "ranking_cache"
+    key = db.Column(db.String, primary_key=True)
+    ranking = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.Float, nullable=False, index=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def serialize(self):
+        return {
+            "key": self.key,
+            "ranking": self.ranking,
+            "created_at": self.created_at,
+        }
@@ -0,0 +1,19 @@
+from .base import db
+
+
+class CatalogState(db.Model):
+    """
+    Single-row table holding the catalog version stamp. The seeder bumps it
+    whenever it rewrites the catalog tables.
+    """
+
+    __tablename__ = "catalog_state"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.Float)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def serialize(self):
+        return {"version": self.version, "updated_at": self.updated_at}
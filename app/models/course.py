@@ -1,3 +1,4 @@
+import json
 from .base import db
 from .association import CoursePrereq
 from .section import CourseSection
@@ -13,6 +14,8 @@ class Course(db.Model):
     name = db.Column(db.String, nullable=False)
     description = db.Column(db.String)
     credits = db.Column(db.Integer)
+    # parsed requirement expression as JSON, see app/prereqs.py
+    prereq_tree = db.Column(db.String)
 
     sections = db.relationship("CourseSection", backref="course", lazy=True)
     prereqs = db.relationship(
@@ -23,7 +26,7 @@ class Course(db.Model):
     )
     required_by = db.relationship(
         "CoursePrereq",
-        foreign_keys="CoursePrereq.prereq_number",
+        primaryjoin="Course.number == foreign(CoursePrereq.prereq_number)",
         backref="prereq",
         lazy=True,
     )
@@ -31,13 +34,26 @@ class Course(db.Model):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def serialize(self):
-        return {
+    def serialize(self, fields=None):
+        """
+        Pass a set of field names to serialize only those. Relations that are
+        not requested are not loaded.
+        """
+        data = {
             "number": self.number,
             "name": self.name,
             "description": self.description,
             "credits": self.credits,
-            "sections": [s.serialize_no_course() for s in self.sections],
-            "prereqs": [p.serialize_without_course() for p in self.prereqs],
-            "required_by": [rb.serialize_without_prereq() for rb in self.required_by],
+            "prereq_tree": json.loads(self.prereq_tree) if self.prereq_tree else None,
         }
+        if fields is not None:
+            data = {k: v for k, v in data.items() if k in fields}
+        if fields is None or "sections" in fields:
+            data["sections"] = [s.serialize_no_course() for s in self.sections]
+        if fields is None or "prereqs" in fields:
+            data["prereqs"] = [p.serialize_without_course() for p in self.prereqs]
+        if fields is None or "required_by" in fields:
+            data["required_by"] = [
+                rb.serialize_without_prereq() for rb in self.required_by
+            ]
+        return data
@@ -0,0 +1,38 @@
+import json
+from .base import db
+
+
+class GenerationJob(db.Model):
+    """
+    A queued schedule generation request, run by a background worker.
+    """
+
+    __tablename__ = "generation_job"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id"), nullable=False, index=True
+    )
+    # request body as JSON
+    payload = db.Column(db.String, nullable=False)
+    # queued, running, done or failed
+    status = db.Column(db.String, nullable=False, default="queued", index=True)
+    result = db.Column(db.String)
+    error = db.Column(db.String)
+    created_at = db.Column(db.Float, nullable=False)
+    started_at = db.Column(db.Float)
+    finished_at = db.Column(db.Float)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
@@ -8,10 +8,19 @@ class GeneratedSchedule(db.Model):
     """
 
     __tablename__ = "generated_schedule"
+    __table_args__ = (
+        db.Index(
+            "ix_generated_schedule_user_hash", "user_id", "content_hash", unique=True
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    # score = db.Column(db.Float)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id"), nullable=False, index=True
+    )
+    score = db.Column(db.Float)
     rationale = db.Column(db.String)
+    # sha1 of the sorted section ids; see app/schedule_store.py
+    content_hash = db.Column(db.String)
 
     schedule_sections = db.relationship(
         "ScheduleSection", backref="schedule", cascade="all, delete-orphan"
@@ -24,7 +33,7 @@ class GeneratedSchedule(db.Model):
         return {
             "id": self.id,
             "user_id": self.user_id,
-            # "score": self.score,
+            "score": self.score,
             "rationale": self.rationale,
             "sections": [s.section.serialize() for s in self.schedule_sections],
         }
@@ -34,7 +43,7 @@ class GeneratedSchedule(db.Model):
             "id": self.id,
             "user_id": self.user_id,
             "rationale": self.rationale,
-            # "score": self.score,
+            "score": self.score,
         }
 
 
@@ -51,7 +60,11 @@ class ScheduleSection(db.Model):
         primary_key=True,
     )
     section_id = db.Column(
-        db.Integer, db.ForeignKey("course_section.id"), nullable=False, primary_key=True
+        db.Integer,
+        db.ForeignKey("course_section.id"),
+        nullable=False,
+        primary_key=True,
+        index=True,
     )
 
     def __init__(self, **kwargs):
@@ -0,0 +1,48 @@
+from sqlalchemy import inspect, text
+from .base import db
+
+
+def upgrade_schema():
+    """
+    Bring an existing database up to date with the models.
+    db.create_all() only creates missing tables, so nullable columns added to
+    a model after its table was created are added here with ALTER TABLE,
+    indexes declared later are created, and foreign keys a model no longer
+    declares are dropped (except on SQLite, which cannot drop constraints and
+    does not enforce them here).
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {quote(table.name)} "
+                        f"ADD COLUMN {quote(column.name)} {col_type}"
+                    )
+                )
+            declared = {
+                (tuple(col.name for col in fk.columns), fk.referred_table.name)
+                for fk in table.foreign_key_constraints
+            }
+            for fk in inspector.get_foreign_keys(table.name):
+                key = (tuple(fk["constrained_columns"]), fk["referred_table"])
+                if key in declared or not fk["name"] or dialect == "sqlite":
+                    continue
+                drop = "DROP FOREIGN KEY" if dialect == "mysql" else "DROP CONSTRAINT"
+                conn.execute(
+                    text(f"ALTER TABLE {quote(table.name)} {drop} {quote(fk['name'])}")
+                )
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
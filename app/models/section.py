@@ -8,7 +8,9 @@ class CourseSection(db.Model):
 
     __tablename__ = "course_section"
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    course_number = db.Column(db.String, db.ForeignKey("course.number"), nullable=False)
+    course_number = db.Column(
+        db.String, db.ForeignKey("course.number"), nullable=False, index=True
+    )
     section = db.Column(db.String, nullable=False)
     days = db.Column(db.String, nullable=False)
     start_min = db.Column(db.Integer, nullable=True)
@@ -1,6 +1,8 @@
 from .base import db
+from ..availability import display_availability
 from .association import CompletedCourse
 from .schedule import GeneratedSchedule
+from .job import GenerationJob
 
 
 class User(db.Model):
@@ -14,6 +16,9 @@ class User(db.Model):
     graduation_year = db.Column(db.String, nullable=False)
     interests = db.Column(db.String, nullable=True)
     availability = db.Column(db.String, nullable=True)
+    # Bit-packed copy of availability, see app/availability.py
+    availability_mask = db.Column(db.LargeBinary, nullable=True)
+    availability_resolution = db.Column(db.Integer, nullable=True)
 
     completed_courses = db.relationship(
         "CompletedCourse", backref="user", cascade="all, delete-orphan"
@@ -21,6 +26,9 @@ class User(db.Model):
     generated_schedules = db.relationship(
         "GeneratedSchedule", backref="user", cascade="all, delete-orphan"
     )
+    generation_jobs = db.relationship(
+        "GenerationJob", backref="user", cascade="all, delete-orphan"
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -31,7 +39,7 @@ class User(db.Model):
             "netid": self.netid,
             "graduation_year": self.graduation_year,
             "interests": self.interests,
-            "availability": self.availability,
+            "availability": display_availability(self.availability),
             "completed_courses": [
                 c.serialize_without_user_id() for c in self.completed_courses
             ],
@@ -0,0 +1,96 @@
+import base64
+import json
+from collections import namedtuple
+from flask import request
+
+"""
+Keyset pagination and field projection for list endpoints.
+
+A page is requested with ?limit=<n>, and the next one with ?after=<cursor>
+taken from the previous response's "next". The cursor encodes the last key
+returned, so each page is a "WHERE key > :last ORDER BY key LIMIT n" query
+that costs the same however deep the client pages. ?fields=a,b restricts
+each item to those keys; nested relations that are not asked for are not
+loaded at all.
+"""
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+PageParams = namedtuple("PageParams", ["limit", "after", "fields"])
+# Type a decoded cursor must have for each key column
+KEY_TYPES = {"id": int, "number": str}
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def page_params(allowed_fields, key):
+    """
+    Read limit, after and fields from the query string. limit is None when
+    the client did not ask for a page, and fields is None when it did not
+    ask for a projection. The key field is always part of a projection so
+    the next cursor can be built. Raises ValueError on bad input.
+    """
+    args = request.args
+    limit = args.get("limit")
+    after = args.get("after")
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        limit = int(limit)
+    elif after is not None:
+        limit = DEFAULT_PAGE_SIZE
+    if after is not None:
+        after = decode_cursor(after)
+        # a forged cursor must not reach the query as eg. a dict
+        if not isinstance(after, KEY_TYPES[key]) or isinstance(after, bool):
+            raise ValueError("Invalid cursor")
+
+    fields = args.get("fields")
+    if fields is not None:
+        fields = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = fields - set(allowed_fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields.add(key)
+    return PageParams(limit, after, fields)
+
+
+def wants_page(params):
+    return params.limit is not None or params.fields is not None
+
+
+def project(item, fields):
+    """
+    Keep only the requested keys of a serialized item.
+    """
+    if fields is None:
+        return item
+    return {k: v for k, v in item.items() if k in fields}
+
+
+def page_body(name, items, params, key):
+    """
+    Response body for a page. Items were fetched with limit + 1 rows, so a
+    leftover row means there is a next page.
+    """
+    body = {name: items}
+    if params.limit is not None:
+        has_more = len(items) > params.limit
+        del items[params.limit :]
+        body["next"] = encode_cursor(items[-1][key]) if has_more else None
+    return body
+
+
+def fetch_limit(params):
+    return params.limit + 1 if params.limit is not None else None
@@ -0,0 +1,246 @@
+import datetime
+import time
+from collections import namedtuple
+from .availability import busy_mask, user_free_mask
+from .catalog import get_catalog
+from .candidates import candidate_pool, is_grad_level
+from .generator import ELECTIVE_SCORE, MAX_CORE, solve_pool
+from .gpt import apply_ranking
+from .ranker import rank_courses
+
+"""
+Multi-semester planning.
+
+A plan fills every remaining term up to the user's graduation with one
+schedule each, chosen by the same section solver as /schedules/generate/.
+The catalog's compiled requirements are turned into a prerequisite DAG once
+per catalog version (see PrereqGraph): a topological layering and the transitive
+closure of every course's prerequisites. From those the planner knows, for
+any set of completed courses, how many terms each remaining core requirement
+still needs (through its quickest course, when it has alternatives), which
+gives it:
+
+- a bonus for courses on the path to a remaining core course, scaled by how
+  little slack that core course has, so prerequisites are taken early;
+- pruning: a term schedule that leaves some core course unable to finish
+  before graduation is dropped when another alternative keeps them all
+  reachable.
+
+The search is a depth-first walk over (completed courses, term) states,
+trying the best few diverse schedules per term and memoizing each state's
+best continuation. Every solve has a small time budget and the whole plan
+has PLAN_BUDGET_MS. The planner keeps enough of it in reserve to finish the
+path it is on (the terms left, at the average cost of a term so far); once
+only the reserve is left no further alternatives are explored and each
+remaining term takes only its single best schedule, so a plan finishes
+within its budget.
+
+Every term is planned against the current roster's sections.
+"""
+
+# Default alternatives tried per term while within budget
+PLAN_BRANCHING = 3
+MAX_PLAN_TERMS = 8
+# Extra score per remaining core course a course is a prerequisite of,
+# multiplied by urgency (1 when the core course has no slack left)
+UNLOCK_BONUS = ELECTIVE_SCORE
+
+Term = namedtuple("Term", ["season", "year"])
+PlannedTerm = namedtuple("PlannedTerm", ["term", "score", "sections"])
+Plan = namedtuple("Plan", ["terms", "remaining_core", "complete", "states"])
+
+
+def term_label(term):
+    return f"{term.season}{term.year % 100:02d}"
+
+
+def parse_term(label):
+    """
+    "FA26" -> Term("FA", 2026). Raises ValueError on anything else.
+    """
+    label = (label or "").strip().upper()
+    if len(label) != 4 or label[:2] not in ("FA", "SP") or not label[2:].isdigit():
+        raise ValueError("Terms look like FA26 or SP27")
+    return Term(label[:2], 2000 + int(label[2:]))
+
+
+def next_term(term):
+    if term.season == "FA":
+        return Term("SP", term.year + 1)
+    return Term("FA", term.year)
+
+
+def upcoming_term(today=None):
+    """
+    The first term that has not started yet.
+    """
+    today = today or datetime.date.today()
+    if today.month >= 8:
+        return Term("SP", today.year + 1)
+    return Term("FA", today.year)
+
+
+def remaining_terms(graduation_year, start=None):
+    """
+    Terms from `start` (default: the upcoming one) through the spring of the
+    graduation year, at most MAX_PLAN_TERMS.
+    """
+    year = int(graduation_year)
+    term = start or upcoming_term()
+    terms = []
+    while (term.year, term.season == "FA") <= (year, False):
+        terms.append(term)
+        if len(terms) == MAX_PLAN_TERMS:
+            break
+        term = next_term(term)
+    return terms
+
+
+def rank_all_electives(catalog, interests, ranker=None):
+    """
+    Rank every undergraduate, non-core course once for the whole plan.
+    """
+    pairs = [
+        (course, sections[0])
+        for number, course in catalog.courses.items()
+        if number not in catalog.core
+        and not is_grad_level(number)
+        and (sections := catalog.sections_by_course.get(number))
+    ]
+    if not pairs:
+        return []
+    ranked = rank_courses(pairs, interests, len(pairs), mode=ranker)
+    return [course.number for course, _ in ranked]
+
+
+def plan_for_user(
+    user,
+    ranker=None,
+    start=None,
+    budget_ms=2000,
+    term_budget_ms=50,
+    branching=PLAN_BRANCHING,
+):
+    """
+    Plan every remaining term for a user, trying `branching` schedules per
+    term. Returns a Plan whose `complete` is False when the time budget cut
+    the search short.
+    """
+    catalog = get_catalog()
+    graph = catalog.prereq_graph
+    resolution = catalog.resolution
+    busy = busy_mask(user_free_mask(user, resolution), resolution)
+    terms = remaining_terms(user.graduation_year, start)
+    ranked_numbers = rank_all_electives(catalog, user.interests, ranker)
+
+    deadline = time.perf_counter() + budget_ms / 1000
+    memo = {}
+    cut_short = False
+    # terms solved and the seconds they took, to estimate the reserve
+    spent = {"terms": 0, "seconds": 0.0}
+
+    def positions(completed):
+        return {graph.pos[num] for num in completed if num in graph.pos}
+
+    def out_of_time(terms_left):
+        """
+        Whether only the time needed to fill terms_left more terms is left.
+        """
+        per_term = spent["seconds"] / spent["terms"] if spent["terms"] else 0.0
+        return time.perf_counter() + per_term * terms_left >= deadline
+
+    def missed(completed, terms_left):
+        """
+        Core requirements that can no longer be met in terms_left terms.
+        """
+        needed = graph.core_needed(positions(completed))
+        return sum(1 for n in needed.values() if n > terms_left)
+
+    def unlock_bonus(completed, terms_left):
+        done = positions(completed)
+        needed = graph.core_needed(done)
+        bonus = {}
+        for core, n in needed.items():
+            urgency = min(1.0, n / max(terms_left, 1))
+            missing = graph.missing(core, done)
+            for i in range(len(graph.numbers)):
+                if missing >> i & 1:
+                    num = graph.numbers[i]
+                    bonus[num] = bonus.get(num, 0) + UNLOCK_BONUS * urgency
+        return bonus
+
+    def search(completed, t):
+        """
+        Best (score, [Solution per term]) from term t on.
+        """
+        nonlocal cut_short
+        if t == len(terms):
+            return 0.0, ()
+        key = (completed, t)
+        if key in memo:
+            return memo[key]
+
+        terms_left = len(terms) - t
+        started = time.perf_counter()
+        pool = candidate_pool(catalog, completed, busy)
+        if not (pool.core or pool.elective or pool.grad):
+            score, rest = search(completed, t + 1)
+            memo[key] = (score, (None,) + rest)
+            return memo[key]
+
+        width = branching
+        if out_of_time(terms_left):
+            width, cut_short = 1, True
+        ranked = apply_ranking(pool.elective, ranked_numbers)
+        solutions = solve_pool(
+            catalog,
+            pool,
+            ranked,
+            count=width,
+            budget_ms=term_budget_ms,
+            max_core=MAX_CORE,
+            bonus=unlock_bonus(completed, terms_left),
+        )
+
+        spent["terms"] += 1
+        spent["seconds"] += time.perf_counter() - started
+
+        options = []
+        for solution in solutions:
+            after = completed | {sec.course_number for sec in solution.sections}
+            options.append((missed(after, terms_left - 1), solution, after))
+        if options:
+            fewest = min(m for m, _, _ in options)
+            options = [o for o in options if o[0] == fewest]
+
+        best = None
+        for _, solution, after in options:
+            if best is not None and out_of_time(terms_left - 1):
+                cut_short = True
+                break
+            score, rest = search(after, t + 1)
+            total = solution.score + score
+            if best is None or total > best[0]:
+                best = (total, (solution,) + rest)
+        if best is None:
+            score, rest = search(completed, t + 1)
+            best = (score, (None,) + rest)
+        memo[key] = best
+        return best
+
+    completed = frozenset(c.course_number for c in user.completed_courses)
+    _, solutions = search(completed, 0)
+
+    planned = []
+    final = set(completed)
+    for term, solution in zip(terms, solutions):
+        sections = solution.sections if solution else ()
+        final.update(sec.course_number for sec in sections)
+        planned.append(
+            PlannedTerm(term, solution.score if solution else 0.0, sections)
+        )
+    remaining_core = [
+        sorted(group) for group in catalog.core_groups if not group & final
+    ]
+    remaining_core.sort()
+    return Plan(planned, remaining_core, not cut_short, len(memo))
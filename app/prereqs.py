@@ -0,0 +1,459 @@
+import re
+import numpy as np
+
+"""
+Prerequisite expressions.
+
+The roster describes requirements in English ("Prerequisite: CS 2110 or
+CS 2112, and CS 2800. Corequisite: CS 4820."). parse_requirements turns that
+into a small boolean tree stored as JSON on Course.prereq_tree:
+
+    "CS 2110"                         a course
+    {"and": [...]} / {"or": [...]}    all / any of the children
+    {"coreq": tree}                   a corequisite requirement
+
+"or" binds tighter than "and", a comma separated list takes the conjunction
+before its last item ("A, B, or C"), and sentences are joined with "and".
+List items that name no course (", or permission of instructor") are
+dropped before that, so they never turn a conjunction into a disjunction.
+Parenthesized text right after a course is treated as a note and skipped,
+unless it is an alternative naming courses ("CS 2110 (or CS 2112)").
+
+PrereqProgram compiles the trees of a whole catalog into clauses (an "and"
+of "or"s) over course positions, so checking every course against one
+user's completed courses is a couple of numpy operations. Corequisites
+count as prerequisites, because schedules are not built around pairing a
+course with its corequisite. Courses outside the catalog count as satisfied,
+since they cannot be recorded as completed.
+"""
+
+COURSE_RE = r"[A-Z]{2,5}[ -]?\d{4}"
+TOKEN_RE = re.compile(
+    rf"(?P<course>\b{COURSE_RE}\b)|(?P<and>(?i:\band\b))|(?P<or>(?i:\bor\b))"
+    r"|(?P<sym>[(),;.])"
+)
+LABEL_RE = re.compile(
+    r"(recommended prerequisites?|prerequisites? or corequisites?|"
+    r"prerequisites?|corequisites?)\s*:",
+    re.IGNORECASE,
+)
+# Clauses per course before a requirement is too complex to expand to CNF
+MAX_CLAUSES = 256
+
+
+def normalize_number(text):
+    match = re.match(r"([A-Za-z]+)[ -]?(\d{4})", text)
+    return f"{match.group(1).upper()} {match.group(2)}"
+
+
+def tokenize(text):
+    """
+    Course numbers, "and", "or" and punctuation; other words are dropped.
+    """
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "course":
+            tokens.append(("course", normalize_number(match.group())))
+        elif kind == "sym":
+            tokens.append((match.group(), None))
+        else:
+            tokens.append((kind, None))
+    return tokens
+
+
+def _node(op, children):
+    """
+    Build an and/or node, flattening nested nodes of the same kind and
+    dropping duplicates and empty children.
+    """
+    flat = []
+    for child in children:
+        if child is None:
+            continue
+        if isinstance(child, dict) and op in child:
+            flat.extend(child[op])
+        else:
+            flat.append(child)
+    unique = []
+    for child in flat:
+        if child not in unique:
+            unique.append(child)
+    if not unique:
+        return None
+    if len(unique) == 1:
+        return unique[0]
+    return {op: unique}
+
+
+def _split(tokens, kind):
+    parts, current = [], []
+    for token in tokens:
+        if token[0] == kind:
+            parts.append(current)
+            current = []
+        else:
+            current.append(token)
+    parts.append(current)
+    return parts
+
+
+def _group_parens(tokens):
+    """
+    Nest parenthesized runs: a ("group", [tokens]) token per (...) block.
+    Unbalanced parentheses are ignored.
+    """
+    stack = [[]]
+    for token in tokens:
+        if token[0] == "(":
+            stack.append([])
+        elif token[0] == ")":
+            if len(stack) > 1:
+                inner = stack.pop()
+                stack[-1].append(("group", inner))
+        else:
+            stack[-1].append(token)
+    while len(stack) > 1:
+        inner = stack.pop()
+        stack[-1].extend(inner)
+    return stack[0]
+
+
+def _operand(tokens):
+    """
+    A run of operands with no operator between them: the first course (or
+    group) counts, "(or ...)" groups after it add alternatives, and anything
+    else after it is a note.
+    """
+    first, alternatives = None, []
+    for kind, value in tokens:
+        if first is None:
+            if kind == "course":
+                first = value
+            elif kind == "group":
+                first = _expression(value)
+        elif kind == "group" and value and value[0][0] == "or":
+            alternatives.append(_expression(value[1:]))
+    if first is None:
+        return None
+    return _node("or", [first] + alternatives)
+
+
+def _names_course(tokens):
+    return any(
+        kind == "course" or (kind == "group" and _names_course(value))
+        for kind, value in tokens
+    )
+
+
+def _conjunction(tokens):
+    """
+    "x or y and z": "and" separates terms, "or" separates operands.
+    """
+    return _node(
+        "and",
+        [
+            _node("or", [_operand(part) for part in _split(term, "or")])
+            for term in _split(tokens, "and")
+        ],
+    )
+
+
+def _expression(tokens):
+    # items without a course ("or permission of instructor") never decide
+    # between "and" and "or"
+    items = [item for item in _split(tokens, ",") if _names_course(item)]
+    if not items:
+        return None
+    op = "or" if items[-1][0][0] == "or" else "and"
+    parsed = []
+    for item in items:
+        if len(items) > 1 and item[0][0] in ("and", "or"):
+            item = item[1:]
+        parsed.append(_conjunction(item))
+    return _node(op, parsed)
+
+
+def parse_clause(text):
+    """
+    Parse one requirement sentence into a tree, or None without courses.
+    """
+    tokens = _group_parens(tokenize(text))
+    sentences = [
+        part
+        for sentence in _split(tokens, ".")
+        for part in _split(sentence, ";")
+        if part
+    ]
+    return _node("and", [_expression(sentence) for sentence in sentences])
+
+
+def parse_requirements(text):
+    """
+    Parse a catalogPrereqCoreq string into a tree (None when it names no
+    courses). Recommended prerequisites are ignored.
+    """
+    text = text or ""
+    parts = []
+    labels = list(LABEL_RE.finditer(text))
+    if not labels:
+        return parse_clause(text)
+    if labels[0].start() > 0:
+        parts.append(parse_clause(text[: labels[0].start()]))
+    for i, label in enumerate(labels):
+        end = labels[i + 1].start() if i + 1 < len(labels) else len(text)
+        kind = label.group(1).lower()
+        if kind.startswith("recommended"):
+            continue
+        tree = parse_clause(text[label.end() : end])
+        if tree is not None and kind.startswith("corequisite"):
+            tree = {"coreq": tree}
+        parts.append(tree)
+    return _node("and", parts)
+
+
+def tree_courses(tree):
+    """
+    Every course number mentioned in a tree.
+    """
+    if tree is None:
+        return set()
+    if isinstance(tree, str):
+        return {tree}
+    (children,) = tree.values()
+    if isinstance(children, list):
+        return set().union(*(tree_courses(c) for c in children))
+    return tree_courses(children)
+
+
+def to_clauses(tree, known):
+    """
+    Expand a tree into CNF: a list of clauses, each a frozenset of course
+    numbers of which one must be completed. Clauses mentioning a course
+    outside `known` are always satisfied and left out. Returns None if the
+    expansion would exceed MAX_CLAUSES.
+    """
+    if tree is None:
+        return []
+    if isinstance(tree, str):
+        return [frozenset([tree])] if tree in known else []
+    if "coreq" in tree:
+        return to_clauses(tree["coreq"], known)
+    if "and" in tree:
+        clauses = []
+        for child in tree["and"]:
+            sub = to_clauses(child, known)
+            if sub is None:
+                return None
+            clauses.extend(sub)
+        return _minimize(clauses)
+    # or: distribute, picking one clause from each child
+    clauses = [frozenset()]
+    for child in tree["or"]:
+        sub = to_clauses(child, known)
+        if sub is None:
+            return None
+        if not sub:
+            # this alternative is always satisfied, so the "or" is too
+            return []
+        clauses = [a | b for a in clauses for b in sub]
+        if len(clauses) > MAX_CLAUSES:
+            return None
+    return _minimize(clauses)
+
+
+def _minimize(clauses):
+    """
+    Drop duplicate clauses and clauses implied by a smaller one.
+    """
+    unique = sorted(set(clauses), key=len)
+    kept = []
+    for clause in unique:
+        if not any(k <= clause for k in kept):
+            kept.append(clause)
+    return kept
+
+
+class PrereqProgram:
+    """
+    Requirements of every catalog course as CNF over course positions:
+    clause c belongs to course owner[c] and is satisfied when any of
+    literals[ptr[c]:ptr[c + 1]] is completed.
+    """
+
+    def __init__(self, numbers, owner, ptr, literals):
+        self.numbers = numbers
+        self.pos = {num: i for i, num in enumerate(numbers)}
+        self.owner = owner
+        self.ptr = ptr
+        self.literals = literals
+
+    @classmethod
+    def compile(cls, numbers, trees, fallback=None):
+        """
+        `trees` maps course number to its requirement tree. Courses without a
+        tree use `fallback`, a mapping of number to prereq numbers that must
+        all be completed (the flat course_prereq rows).
+        """
+        numbers = list(numbers)
+        known = {num: i for i, num in enumerate(numbers)}
+        fallback = fallback or {}
+        owner, ptr, literals = [], [0], []
+        for i, num in enumerate(numbers):
+            tree = trees.get(num)
+            if tree is None:
+                tree = _node("and", sorted(fallback.get(num, ())))
+            clauses = to_clauses(tree, known)
+            if clauses is None:
+                # too complex to expand: require every mentioned course
+                clauses = [frozenset([c]) for c in tree_courses(tree) & known.keys()]
+            for clause in clauses:
+                owner.append(i)
+                literals.extend(sorted(known[c] for c in clause))
+                ptr.append(len(literals))
+        return cls(
+            numbers,
+            np.asarray(owner, dtype=np.int64),
+            np.asarray(ptr, dtype=np.int64),
+            np.asarray(literals, dtype=np.int64),
+        )
+
+    def completed_bits(self, completed):
+        """
+        Boolean vector over course positions for a set of course numbers.
+        """
+        bits = np.zeros(len(self.numbers), dtype=bool)
+        idx = [self.pos[num] for num in completed if num in self.pos]
+        bits[idx] = True
+        return bits
+
+    def eligible(self, completed):
+        """
+        Boolean vector: True where the course's requirements are met.
+        """
+        eligible = np.ones(len(self.numbers), dtype=bool)
+        if not len(self.owner):
+            return eligible
+        bits = self.completed_bits(completed)
+        satisfied = np.logical_or.reduceat(bits[self.literals], self.ptr[:-1])
+        eligible[self.owner[~satisfied]] = False
+        return eligible
+
+
+class PrereqGraph:
+    """
+    Prerequisite DAG over the positions of a PrereqProgram. `order` is a
+    topological order (cycles, which the roster text can contain, are
+    appended at the end), `layer[i]` the length of the longest prerequisite
+    chain below course i, `ancestors[i]` a bitset of every course reachable
+    through its prerequisites and `dependents[i]` the courses that name i in
+    their requirements. `core_groups` lists the core requirements, each a
+    set of alternative course numbers.
+    """
+
+    def __init__(self, program, core_groups=()):
+        self.numbers = program.numbers
+        self.pos = program.pos
+        n = len(self.numbers)
+
+        # clauses[i]: tuple of clauses, each a tuple of literal positions
+        clauses = [[] for _ in range(n)]
+        ptr = program.ptr.tolist()
+        literals = program.literals.tolist()
+        for c, owner in enumerate(program.owner.tolist()):
+            clauses[owner].append(tuple(literals[ptr[c] : ptr[c + 1]]))
+        self.clauses = [tuple(c) for c in clauses]
+        direct = [{lit for clause in cs for lit in clause} for cs in self.clauses]
+
+        self.dependents = [[] for _ in range(n)]
+        indegree = [0] * n
+        for i, prereqs in enumerate(direct):
+            for p in prereqs:
+                self.dependents[p].append(i)
+                indegree[i] += 1
+        order = [i for i in range(n) if indegree[i] == 0]
+        for i in order:
+            for d in self.dependents[i]:
+                indegree[d] -= 1
+                if indegree[d] == 0:
+                    order.append(d)
+        placed = set(order)
+        order.extend(i for i in range(n) if i not in placed)
+        self.order = order
+
+        self.layer = [0] * n
+        self.ancestors = [0] * n
+        for i in order:
+            for p in direct[i]:
+                self.ancestors[i] |= (1 << p) | self.ancestors[p]
+                self.layer[i] = max(self.layer[i], self.layer[p] + 1)
+
+        # positions per core requirement; requirements with no course in
+        # the catalog are left out
+        groups = (
+            tuple(sorted(self.pos[num] for num in group if num in self.pos))
+            for group in core_groups
+        )
+        self.core_groups = [group for group in groups if group]
+        self.core = [i for group in self.core_groups for i in group]
+
+    def satisfied(self, i, completed):
+        """
+        Whether course i's requirements are met by a set of positions.
+        """
+        return all(
+            any(lit in completed for lit in clause) for clause in self.clauses[i]
+        )
+
+    def terms_needed(self, completed, targets):
+        """
+        For each target course not completed: the fewest terms needed to
+        take it, counting the prerequisite chain still missing (choosing the
+        shortest alternative in each "or").
+        """
+        relevant = 0
+        for t in targets:
+            relevant |= self.ancestors[t] | (1 << t)
+        need = {}
+        for i in self.order:
+            if not relevant >> i & 1:
+                continue
+            if i in completed:
+                need[i] = 0
+                continue
+            longest = 0
+            for clause in self.clauses[i]:
+                longest = max(longest, min(need.get(lit, 1) for lit in clause))
+            need[i] = longest + 1
+        return {t: need[t] for t in targets if t not in completed}
+
+    def missing(self, i, completed):
+        """
+        Bitset of the courses on course i's unmet requirement clauses, and
+        recursively on theirs: what could still be taken on the way to i.
+        """
+        found = 0
+        stack = [i]
+        while stack:
+            for clause in self.clauses[stack.pop()]:
+                if any(lit in completed for lit in clause):
+                    continue
+                for lit in clause:
+                    if not found >> lit & 1:
+                        found |= 1 << lit
+                        stack.append(lit)
+        return found
+
+    def core_needed(self, completed):
+        """
+        For each core requirement none of whose courses is completed: its
+        quickest course and the terms that course needs, as {position: terms}.
+        """
+        needed = self.terms_needed(completed, self.core)
+        quickest = {}
+        for group in self.core_groups:
+            if any(i in completed for i in group):
+                continue
+            best = min(group, key=needed.__getitem__)
+            quickest[best] = needed[best]
+        return quickest
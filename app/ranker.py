@@ -0,0 +1,236 @@
+import os
+import re
+import numpy as np
+from flask import current_app
+from .catalog import get_catalog
+from .gpt import apply_ranking, gpt_rank_courses
+
+"""
+Local TF-IDF ranker, an offline alternative to gpt_rank_courses.
+
+Course names and descriptions are turned into a TF-IDF matrix once per
+catalog version (at seed/sync time, or on first use) and saved next to the
+database, stamped with that version. The in-memory index is memoized on the
+CatalogIndex, so a process that picks up a new catalog version also gets a
+matching index: the saved one when its stamp matches, else a rebuilt one.
+
+The matrix is stored column-major: for every term, the courses it appears
+in and their weights. Scoring a student's interests then only touches the
+columns of the terms they mention, so ranking thousands of candidates takes
+a few milliseconds and needs no network access.
+"""
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    """a an and are as at be by for from how in into is it of on or our the this
+    to with will students course topics including introduction""".split()
+)
+# Words in a course name count this many times as much as description words
+NAME_WEIGHT = 2
+INDEX_FILENAME = "tfidf_index.npz"
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class TfidfIndex:
+    """
+    Term-major sparse TF-IDF matrix over the catalog.
+    """
+
+    def __init__(self, numbers, terms, idf, term_ptr, rows, weights, version=None):
+        # catalog version the index was built from
+        self.version = version
+        self.numbers = numbers
+        self.row_of = {num: i for i, num in enumerate(numbers)}
+        self.terms = terms
+        self.col_of = {term: j for j, term in enumerate(terms)}
+        self.idf = idf
+        # column j holds rows[term_ptr[j]:term_ptr[j + 1]]
+        self.term_ptr = term_ptr
+        self.rows = rows
+        self.weights = weights
+
+    @classmethod
+    def build(cls, courses, version=None):
+        """
+        Build from an iterable of objects with number, name and description.
+        """
+        numbers, terms, col_of = [], [], {}
+        doc_idx, term_idx, counts = [], [], []
+        for i, course in enumerate(courses):
+            numbers.append(course.number)
+            tf = {}
+            for token in tokenize(course.name):
+                tf[token] = tf.get(token, 0) + NAME_WEIGHT
+            for token in tokenize(course.description):
+                tf[token] = tf.get(token, 0) + 1
+            for token, count in tf.items():
+                if token not in col_of:
+                    col_of[token] = len(terms)
+                    terms.append(token)
+                doc_idx.append(i)
+                term_idx.append(col_of[token])
+                counts.append(count)
+
+        n_docs, n_terms = len(numbers), len(terms)
+        doc_idx = np.asarray(doc_idx, dtype=np.int32)
+        term_idx = np.asarray(term_idx, dtype=np.int32)
+        counts = np.asarray(counts, dtype=np.float32)
+
+        df = np.bincount(term_idx, minlength=n_terms)
+        idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        weights = (1 + np.log(counts)) * idf[term_idx]
+        norms = np.sqrt(np.bincount(doc_idx, weights=weights**2, minlength=n_docs))
+        weights /= np.where(norms > 0, norms, 1)[doc_idx].astype(np.float32)
+
+        order = np.argsort(term_idx, kind="stable")
+        term_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=term_ptr[1:])
+        return cls(
+            numbers,
+            terms,
+            idf,
+            term_ptr,
+            doc_idx[order],
+            weights[order].astype(np.float32),
+            version,
+        )
+
+    def scores(self, interests):
+        """
+        Cosine similarity of every course to the interests, in row order.
+        """
+        tf = {}
+        for token in tokenize(interests):
+            if token in self.col_of:
+                tf[token] = tf.get(token, 0) + 1
+        scores = np.zeros(len(self.numbers), dtype=np.float32)
+        for token, count in tf.items():
+            j = self.col_of[token]
+            lo, hi = self.term_ptr[j], self.term_ptr[j + 1]
+            q = (1 + np.log(count)) * self.idf[j]
+            # a course appears at most once per column, so no duplicate rows
+            scores[self.rows[lo:hi]] += q * self.weights[lo:hi]
+        return scores
+
+    def rank(self, numbers, interests):
+        """
+        Order course numbers by similarity to the interests. Ties keep the
+        given order; courses missing from the index score zero.
+        """
+        all_scores = self.scores(interests)
+        candidate_scores = np.array(
+            [all_scores[self.row_of[n]] if n in self.row_of else 0.0 for n in numbers],
+            dtype=np.float32,
+        )
+        order = np.argsort(-candidate_scores, kind="stable")
+        return [numbers[i] for i in order]
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            numbers=np.array(self.numbers),
+            terms=np.array(self.terms),
+            idf=self.idf,
+            term_ptr=self.term_ptr,
+            rows=self.rows,
+            weights=self.weights,
+            version=np.array(-1 if self.version is None else self.version),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            # files saved before the version stamp existed never match
+            version = int(data["version"]) if "version" in data.files else -1
+            return cls(
+                data["numbers"].tolist(),
+                data["terms"].tolist(),
+                data["idf"],
+                data["term_ptr"],
+                data["rows"],
+                data["weights"],
+                None if version < 0 else version,
+            )
+
+
+def index_path():
+    return current_app.config.get("RANKER_INDEX_PATH") or os.path.join(
+        current_app.instance_path, INDEX_FILENAME
+    )
+
+
+def saved_tfidf_index(catalog):
+    """
+    The saved index if it was built from this catalog version, else None.
+    """
+    path = index_path()
+    if not os.path.exists(path):
+        return None
+    index = TfidfIndex.load(path)
+    return index if index.version == catalog.version else None
+
+
+def build_tfidf_index(catalog):
+    """
+    Build the index from the catalog and save it.
+    """
+    index = TfidfIndex.build(catalog.courses.values(), catalog.version)
+    path = index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    index.save(path)
+    return index
+
+
+def rebuild_tfidf_index(catalog):
+    """
+    Build and save the index for a new catalog version. Called by the seeder
+    and sync-catalog.
+    """
+    index = build_tfidf_index(catalog)
+    return catalog.derived("tfidf_index", lambda _: index)
+
+
+def load_tfidf_index():
+    """
+    Load the saved index if it matches the catalog. Called at startup.
+    """
+    catalog = get_catalog()
+    index = saved_tfidf_index(catalog)
+    if index is not None:
+        catalog.derived("tfidf_index", lambda _: index)
+
+
+def get_tfidf_index():
+    """
+    The index for the current catalog version, loaded or built on first use.
+    """
+    return get_catalog().derived(
+        "tfidf_index",
+        lambda catalog: saved_tfidf_index(catalog) or build_tfidf_index(catalog),
+    )
+
+
+def tfidf_rank_courses(courses, interests, remaining_slots):
+    """
+    Same contract as gpt_rank_courses, scored locally with TF-IDF.
+    """
+    if not interests or len(courses) <= 1:
+        return courses[:remaining_slots]
+    numbers = list(dict.fromkeys(course.number for course, _ in courses))
+    ranked_numbers = get_tfidf_index().rank(numbers, interests)
+    return apply_ranking(courses, ranked_numbers)[:remaining_slots]
+
+
+RANKERS = {"gpt": gpt_rank_courses, "tfidf": tfidf_rank_courses}
+
+
+def rank_courses(courses, interests, remaining_slots, mode=None):
+    """
+    Rank elective (course, section) pairs with the chosen ranker
+    (defaults to the RANKER setting).
+    """
+    mode = mode or current_app.config.get("RANKER", "gpt")
+    return RANKERS[mode](courses, interests, remaining_slots)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import delete, func, insert, select
+from app.models import db, RankingCacheEntry
+
+"""
+Two-tier cache for elective rankings.
+
+A ranking only depends on the student's interests and the set of candidate
+courses, so identical (or trivially different) requests can reuse an earlier
+LLM answer. Lookups go to an in-process LRU first and then to the
+ranking_cache table, which survives restarts. Both tiers expire entries
+after a TTL and evict the oldest entries once they reach their size limit.
+"""
+
+
+def normalize_interests(interests):
+    """
+    Lowercase, collapse whitespace and sort the comma separated interests,
+    so "AI, Systems" and "systems,ai" share a cache entry.
+    """
+    parts = {" ".join(part.lower().split()) for part in re.split(r"[,;\n]", interests)}
+    return ", ".join(sorted(p for p in parts if p))
+
+
+def ranking_key(interests, course_numbers):
+    """
+    Cache key for a ranking request.
+    """
+    courses = hashlib.sha256("\n".join(sorted(set(course_numbers))).encode())
+    return hashlib.sha256(
+        f"{normalize_interests(interests)}|{courses.hexdigest()}".encode()
+    ).hexdigest()
+
+
+class RankingCache:
+    """
+    In-process LRU in front of the persistent ranking_cache table.
+    """
+
+    def __init__(self, memory_size=1024, db_size=10000, ttl=86400):
+        self.memory_size = memory_size
+        self.db_size = db_size
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+    def get(self, key):
+        """
+        Return the cached list of course numbers, or None.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, ranking = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return ranking
+                del self._memory[key]
+
+        row = None
+        if has_app_context():
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(
+                        RankingCacheEntry.ranking, RankingCacheEntry.created_at
+                    ).where(RankingCacheEntry.key == key)
+                ).first()
+        if row is None or now - row.created_at >= self.ttl:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        ranking = json.loads(row.ranking)
+        with self._lock:
+            self.stats["db_hits"] += 1
+            self._remember(key, row.created_at, ranking)
+        return ranking
+
+    def put(self, key, ranking):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, ranking)
+        if not has_app_context():
+            return
+        with db.engine.begin() as conn:
+            conn.execute(delete(RankingCacheEntry).where(RankingCacheEntry.key == key))
+            conn.execute(
+                insert(RankingCacheEntry).values(
+                    key=key, ranking=json.dumps(ranking), created_at=now
+                )
+            )
+            self._evict_db(conn, now)
+
+    def _remember(self, key, created_at, ranking):
+        self._memory[key] = (created_at, ranking)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_db(self, conn, now):
+        expired = conn.execute(
+            delete(RankingCacheEntry).where(
+                RankingCacheEntry.created_at <= now - self.ttl
+            )
+        ).rowcount
+        count = conn.execute(select(func.count()).select_from(RankingCacheEntry))
+        overflow = count.scalar() - self.db_size
+        if overflow > 0:
+            # keys first: MySQL rejects IN (SELECT ... LIMIT n), and a
+            # subquery on the table being deleted from
+            oldest = conn.execute(
+                select(RankingCacheEntry.key)
+                .order_by(RankingCacheEntry.created_at)
+                .limit(overflow)
+            ).scalars().all()
+            conn.execute(
+                delete(RankingCacheEntry).where(RankingCacheEntry.key.in_(oldest))
+            )
+        with self._lock:
+            self.stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if has_app_context():
+            with db.engine.begin() as conn:
+                conn.execute(delete(RankingCacheEntry))
+
+
+def get_ranking_cache():
+    """
+    The app's ranking cache, or None outside an app context.
+    """
+    if not has_app_context():
+        return None
+    cache = current_app.extensions.get("ranking_cache")
+    if cache is None:
+        cache = RankingCache(
+            memory_size=current_app.config.get("RANKING_CACHE_SIZE", 1024),
+            db_size=current_app.config.get("RANKING_CACHE_DB_SIZE", 10000),
+            ttl=current_app.config.get("RANKING_CACHE_TTL", 86400),
+        )
+        current_app.extensions["ranking_cache"] = cache
+    return cache
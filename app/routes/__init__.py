@@ -2,5 +2,6 @@ from .home import home_bp
 from .users import users_bp
 from .courses import courses_bp
 from .schedules import schedules_bp
+from .metrics import metrics_bp
 
-blueprints = [home_bp, users_bp, courses_bp, schedules_bp]
+blueprints = [home_bp, users_bp, courses_bp, schedules_bp, metrics_bp]
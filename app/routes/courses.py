@@ -1,38 +1,163 @@
-from flask import Blueprint
-from app.models import Course, CourseSection, CoreClass
-from ..utils import success_response, failure_response
+from flask import Blueprint, request
+from app.models import Course, CourseSection, CoreClass, User
+from ..availability import (
+    MINUTES_PER_DAY,
+    full_mask,
+    parse_days,
+    user_free_mask,
+    windows_to_mask,
+)
+from ..catalog import get_catalog
+from ..utils import (
+    course_number,
+    success_response,
+    failure_response,
+    cached_response,
+    stream_response,
+    wants_stream,
+)
+from ..pagination import fetch_limit, page_body, page_params, project, wants_page
+from ..serializers import (
+    COURSE_FIELDS,
+    SECTION_FIELDS,
+    iter_courses,
+    iter_sections,
+    serialize_courses,
+    serialize_sections,
+)
 
 courses_bp = Blueprint("courses", __name__, url_prefix="/courses")
 
+WINDOW_PARAMS = ("days", "start", "end")
+ALL_DAYS = "MTWRFSSu"
+
 
 @courses_bp.route("/")
 def list_courses():
     """
-    Return all CS courses in the catalog.
+    Return all courses in the catalog.
+    Add ?limit=&after= to page through them and ?fields= to pick fields,
+    or ?stream=1 to stream the list instead of sending the cached body.
     """
-    courses = Course.query.all()
-    return success_response({"courses": [course.serialize() for course in courses]})
+    try:
+        params = page_params(COURSE_FIELDS, "number")
+    except ValueError as e:
+        return failure_response(str(e), code=400)
+    if wants_page(params):
+        criteria = [] if params.after is None else [Course.number > params.after]
+        courses = serialize_courses(
+            *criteria, limit=fetch_limit(params), fields=params.fields
+        )
+        return success_response(page_body("courses", courses, params, "number"))
+    if wants_stream():
+        return stream_response("courses", iter_courses())
+    payload = get_catalog().payload(
+        "courses", lambda: {"courses": list(iter_courses())}
+    )
+    return cached_response(payload)
 
 
-@courses_bp.route("/<int:number>/")
+@courses_bp.route("/<number>/")
 def get_course(number):
     """
-    Get info about a single course.
+    Get info about a single course, eg. /courses/MATH-1920/. A number without
+    a subject (/courses/2110/) is a CS course.
     """
-    number_str = f"CS {number}"
-    course = Course.query.get(number_str)
-    if course is None:
+    try:
+        number_str = course_number(number)
+    except ValueError:
+        return failure_response("Course not found")
+    catalog = get_catalog()
+    if number_str not in catalog.courses:
         return failure_response("Course not found")
-    return success_response(course.serialize())
+    payload = catalog.payload(
+        ("course", number_str), lambda: Course.query.get(number_str).serialize()
+    )
+    return cached_response(payload)
+
+
+def time_filter(args, resolution):
+    """
+    Free mask for the time filters of /courses/sections/: the availability
+    of user ?fits=<user_id> and/or the window ?days=&start=&end=, both when
+    given. Raises ValueError on bad input and LookupError for an unknown user.
+    """
+    free = full_mask(resolution)
+    if "fits" in args:
+        user_id = args["fits"]
+        if not user_id.isdigit():
+            raise ValueError("fits must be a user id")
+        user = User.query.get(int(user_id))
+        if user is None:
+            raise LookupError("User not found")
+        free &= user_free_mask(user, resolution)
+    if any(name in args for name in WINDOW_PARAMS):
+        days = args.get("days", ALL_DAYS)
+        start = args.get("start", "0")
+        end = args.get("end", str(MINUTES_PER_DAY))
+        if not (start.isdigit() and end.isdigit()) or not (
+            int(start) < int(end) <= MINUTES_PER_DAY
+        ):
+            raise ValueError(
+                f"start and end must be minutes with 0 <= start < end <= "
+                f"{MINUTES_PER_DAY}"
+            )
+        if not parse_days(days):
+            raise ValueError("days must name at least one day, eg. MWF")
+        window = {"days": days, "start_min": int(start), "end_min": int(end)}
+        free &= windows_to_mask([window], resolution)
+    return free
+
+
+def fitting_sections(params):
+    """
+    Sections that fit the time filters, looked up in the catalog's time
+    index, with the same paging and fields as the plain list.
+    """
+    catalog = get_catalog()
+    try:
+        free = time_filter(request.args, catalog.resolution)
+    except LookupError as e:
+        return failure_response(str(e))
+    except ValueError as e:
+        return failure_response(str(e), code=400)
+    sections = [catalog.sections[pos] for pos in catalog.time_index.fitting(free)]
+    if params.after is not None:
+        sections = [sec for sec in sections if sec.id > params.after]
+    sections = [
+        project(sec.serialize(), params.fields)
+        for sec in sections[: fetch_limit(params)]
+    ]
+    return success_response(page_body("sections", sections, params, "id"))
 
 
 @courses_bp.route("/sections/")
 def list_sections():
     """
     Return all CS course sections (Fall 2025).
+    Add ?limit=&after= to page through them and ?fields= to pick fields,
+    or ?stream=1 to stream the list instead of sending the cached body.
+    ?fits=<user_id> and ?days=&start=&end= keep only the sections that fit
+    the user's availability or the window.
     """
-    sections = CourseSection.query.all()
-    return success_response({"sections": [section.serialize() for section in sections]})
+    try:
+        params = page_params(SECTION_FIELDS, "id")
+    except ValueError as e:
+        return failure_response(str(e), code=400)
+    if "fits" in request.args or any(name in request.args for name in WINDOW_PARAMS):
+        return fitting_sections(params)
+    if wants_page(params):
+        criteria = [] if params.after is None else [CourseSection.id > params.after]
+        sections = serialize_sections(
+            *criteria, limit=fetch_limit(params), fields=params.fields
+        )
+        return success_response(page_body("sections", sections, params, "id"))
+    if wants_stream():
+        return stream_response("sections", iter_sections())
+    payload = get_catalog().payload(
+        "sections", lambda: {"sections": list(iter_sections())}
+    )
+    return cached_response(payload)
 
 
 @courses_bp.route("/sections/<int:section_id>/")
@@ -51,5 +176,8 @@ def get_core_courses():
     """
     Return the 7 core CS courses.
     """
-    core_courses = [course.serialize() for course in CoreClass.query.all()]
-    return success_response({"courses": core_courses})
+    payload = get_catalog().payload(
+        "core-sets",
+        lambda: {"courses": [course.serialize() for course in CoreClass.query.all()]},
+    )
+    return cached_response(payload)
@@ -0,0 +1,18 @@
+from flask import Blueprint, Response
+from .. import metrics
+from ..candidates import get_pool_cache
+from ..ranking_cache import get_ranking_cache
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics")
+def get_metrics():
+    """
+    Request, SQL, LLM, generation and cache metrics for Prometheus.
+    """
+    caches = {
+        "ranking": get_ranking_cache().stats,
+        "candidate_pool": get_pool_cache().stats,
+    }
+    return Response(metrics.render(caches), content_type=metrics.CONTENT_TYPE)
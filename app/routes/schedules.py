@@ -1,33 +1,57 @@
 import json
-import re
-from flask import Blueprint, request
-from app.models import (
-    db,
-    User,
-    GeneratedSchedule,
-    ScheduleSection,
-    Course,
-    CourseSection,
-    CoreClass,
-    CoursePrereq,
-)
+import time
+from flask import Blueprint, current_app, request
+from sqlalchemy.orm import selectinload
+from app.models import db, User, GeneratedSchedule, GenerationJob
+from .. import metrics
 from ..utils import success_response, failure_response
-from ..gpt import gpt_rank_courses
+from ..generator import (
+    MAX_ALTERNATIVES,
+    NO_SECTIONS,
+    generate_and_save,
+    generate_for_users,
+    save_solutions,
+    schedule_payloads,
+)
+from ..jobs import enqueue_generation
+from ..planner import parse_term, plan_for_user, term_label
+from ..pagination import fetch_limit, page_body, page_params
+from ..serializers import SCHEDULE_FIELDS, schedule_load_options, serialize_schedules
+from ..ranker import RANKERS
 
 schedules_bp = Blueprint("schedules", __name__, url_prefix="/schedules")
 
+MAX_BATCH_USERS = 500
+
+
+def is_int(value):
+    """
+    Whether a JSON value is an integer (true and false are bools, not ints).
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
 
 @schedules_bp.route("/<int:user_id>/")
 def list_schedules(user_id):
     """
     List all generated schedules for a user.
+    Add ?limit=&after= to page through them and ?fields= to pick fields.
     """
     user = User.query.get(user_id)
     if user is None:
         return failure_response("User not found")
+    try:
+        params = page_params(SCHEDULE_FIELDS, "id")
+    except ValueError as e:
+        return failure_response(str(e), code=400)
 
-    schedules = [s.serialize() for s in user.generated_schedules]
-    return success_response({"schedules": schedules})
+    criteria = [GeneratedSchedule.user_id == user_id]
+    if params.after is not None:
+        criteria.append(GeneratedSchedule.id > params.after)
+    schedules = serialize_schedules(
+        *criteria, limit=fetch_limit(params), fields=params.fields
+    )
+    return success_response(page_body("schedules", schedules, params, "id"))
 
 
 @schedules_bp.route("/<int:user_id>/<int:sched_id>/")
@@ -35,7 +59,11 @@ def get_schedule(user_id, sched_id):
     """
     Get full details of a specific schedule.
     """
-    schedule = GeneratedSchedule.query.filter_by(id=sched_id, user_id=user_id).first()
+    schedule = (
+        GeneratedSchedule.query.options(*schedule_load_options())
+        .filter_by(id=sched_id, user_id=user_id)
+        .first()
+    )
     if schedule is None:
         return failure_response("Schedule not found")
 
@@ -47,7 +75,11 @@ def delete_schedule(user_id, sched_id):
     """
     Delete a saved schedule.
     """
-    schedule = GeneratedSchedule.query.filter_by(id=sched_id, user_id=user_id).first()
+    schedule = (
+        GeneratedSchedule.query.options(*schedule_load_options())
+        .filter_by(id=sched_id, user_id=user_id)
+        .first()
+    )
     if schedule is None:
         return failure_response("Schedule not found")
 
@@ -60,142 +92,194 @@ def delete_schedule(user_id, sched_id):
 def generate_schedule():
     """
     Generate optimal schedules for a user using LLM + logic.
+    Pass "count" to get that many alternative schedules in one call, and
+    "ranker" ("gpt" or "tfidf") to choose how electives are ranked.
+    With "async": true the request is queued and a job is returned with 202;
+    poll /schedules/jobs/<job_id>/ for the result.
     """
     body = json.loads(request.data)
     user_id = body.get("user_id")
+    count = body.get("count", 1)
+    if not is_int(count) or not 1 <= count <= MAX_ALTERNATIVES:
+        return failure_response(
+            f"count must be an integer between 1 and {MAX_ALTERNATIVES}.", code=400
+        )
+    ranker = body.get("ranker")
+    if ranker is not None and ranker not in RANKERS:
+        return failure_response(
+            f"ranker must be one of: {', '.join(RANKERS)}.", code=400
+        )
     user = User.query.get(user_id)
     if user is None:
         return failure_response("User not found", code=404)
 
-    completed = {c.course_number for c in user.completed_courses}
-    availability = user.availability
-    core_courses = {c.course_number for c in CoreClass.query.all()}
-    num_core_completed = len(core_courses & completed)
-
-    def is_grad_level(course_number):
-        match = re.match(r"CS (\d{4})", course_number)
-        return int(match.group(1)) >= 5000 if match else False
-
-    def is_section_available(section, availability):
-        day_index = {"M": 0, "T": 1, "W": 2, "R": 3, "F": 4}
-        for d in section.days:
-            if d not in day_index:
-                continue
-            day = day_index[d]
-            for m in range(section.start_min, section.end_min, 60):
-                hour = m // 60
-                index = day + 7 * hour
-                if index >= len(availability) or availability[index] == "0":
-                    return False
-        return True
-
-    def has_prereqs(course, completed):
-        number = course.number
-        prereq_rules = {
-            "CS 2110": [["CS 1110", "CS 1112"]],
-            "CS 2112": [["CS 1110", "CS 1112"]],
-            "CS 3110": [["CS 2110"], ["CS 2800", "CS 2802"]],
-            "CS 3700": [["CS 2110"], ["CS 2800", "CS 2802"]],
-            "CS 4410": [["CS 3410", "CS 3420"]],
-            "CS 4414": [["CS 3410", "CS 3420"]],
+    if body.get("async"):
+        job = enqueue_generation(user_id, body)
+        return success_response(job.serialize(), 202)
+
+    payloads = generate_and_save(user, count=count, ranker=ranker)
+    if payloads is None:
+        return failure_response(NO_SECTIONS)
+    if "count" not in body:
+        return success_response(payloads[0], 201)
+    return success_response({"schedules": payloads}, 201)
+
+
+@schedules_bp.route("/plan/", methods=["POST"])
+def plan_schedule():
+    """
+    Plan one schedule per remaining term up to the user's graduation.
+    Takes "user_id", the optional "ranker" and an optional "start_term"
+    (eg. "FA26"). The plan is returned, not saved.
+    """
+    body = json.loads(request.data)
+    ranker = body.get("ranker")
+    if ranker is not None and ranker not in RANKERS:
+        return failure_response(
+            f"ranker must be one of: {', '.join(RANKERS)}.", code=400
+        )
+    start = None
+    if body.get("start_term") is not None:
+        try:
+            start = parse_term(body["start_term"])
+        except (AttributeError, ValueError) as e:
+            return failure_response(f"start_term: {e}", code=400)
+    user = User.query.get(body.get("user_id"))
+    if user is None:
+        return failure_response("User not found", code=404)
+    if not str(user.graduation_year or "").isdigit():
+        return failure_response("User has no graduation year", code=400)
+
+    config = current_app.config
+    plan = plan_for_user(
+        user,
+        ranker=ranker,
+        start=start,
+        budget_ms=config["PLAN_BUDGET_MS"],
+        term_budget_ms=config["PLAN_TERM_BUDGET_MS"],
+        branching=config["PLAN_BRANCHING"],
+    )
+    return success_response(
+        {
+            "user_id": user.id,
+            "terms": [
+                {
+                    "term": term_label(planned.term),
+                    "score": round(planned.score, 3),
+                    "sections": [sec.serialize() for sec in planned.sections],
+                }
+                for planned in plan.terms
+            ],
+            "remaining_core": plan.remaining_core,
+            "complete": plan.complete,
         }
+    )
 
-        if number in prereq_rules:
-            return all(
-                any(pr in completed for pr in group) for group in prereq_rules[number]
-            )
 
-        prereqs = [
-            p.prereq_number
-            for p in CoursePrereq.query.filter_by(course_number=number).all()
-        ]
-        return all(pr in completed for pr in prereqs)
+@schedules_bp.route("/generate/batch/", methods=["POST"])
+def generate_batch():
+    """
+    Generate schedules for many users at once (eg. at an advising event).
+    Takes "user_ids" plus the same optional "count" and "ranker" as
+    /generate/, and reports per-user results and timing.
+    """
+    start = time.perf_counter()
+    body = json.loads(request.data)
+    user_ids = body.get("user_ids")
+    count = body.get("count", 1)
+    ranker = body.get("ranker")
+    if (
+        not isinstance(user_ids, list)
+        or not 1 <= len(user_ids) <= MAX_BATCH_USERS
+        or not all(is_int(i) for i in user_ids)
+    ):
+        return failure_response(
+            f"user_ids must be a list of 1 to {MAX_BATCH_USERS} ids.", code=400
+        )
+    user_ids = list(dict.fromkeys(user_ids))
+    if not is_int(count) or not 1 <= count <= MAX_ALTERNATIVES:
+        return failure_response(
+            f"count must be an integer between 1 and {MAX_ALTERNATIVES}.", code=400
+        )
+    if ranker is not None and ranker not in RANKERS:
+        return failure_response(
+            f"ranker must be one of: {', '.join(RANKERS)}.", code=400
+        )
+
+    users = (
+        User.query.options(selectinload(User.completed_courses))
+        .filter(User.id.in_(user_ids))
+        .all()
+    )
+    load_ms = (time.perf_counter() - start) * 1000
 
-    def sections_overlap(s1, s2):
-        shared_days = set(s1.days) & set(s2.days)
-        if not shared_days:
-            return False
-        return not (s1.end_min <= s2.start_min or s1.start_min >= s2.end_min)
+    solved, stats = generate_for_users(
+        users,
+        count=count,
+        ranker=ranker,
+        workers=current_app.config["BATCH_WORKERS"],
+    )
 
-    core_sections, elective_sections, grad_sections = [], [], []
+    # Write every user's schedules in one transaction
+    persist_start = time.perf_counter()
+    schedule_ids = save_solutions(
+        {
+            user_id: solutions
+            for user_id, (solutions, _) in solved.items()
+            if solutions is not None
+        }
+    )
+    persist_ms = (time.perf_counter() - persist_start) * 1000
 
-    for course in Course.query.all():
-        if course.number in completed:
+    results = []
+    for user_id in user_ids:
+        if user_id not in solved:
+            results.append({"user_id": user_id, "error": "User not found"})
             continue
-        if not has_prereqs(course, completed):
+        solutions, solve_ms = solved[user_id]
+        if solutions is None:
+            results.append({"user_id": user_id, "error": NO_SECTIONS})
             continue
-        for section in course.sections:
-            if not is_section_available(section, availability):
-                continue
-            pair = (course, section)
-            if is_grad_level(course.number):
-                grad_sections.append(pair)
-            elif course.number in core_courses:
-                core_sections.append(pair)
-            else:
-                elective_sections.append(pair)
-
-    if not (core_sections or elective_sections or grad_sections):
-        return failure_response("No available course sections match your schedule.")
-
-    final_sections = []
-    added_courses = set()
-
-    # 1. Fill with core classes (up to 3)
-    max_core = min(3 - num_core_completed, len(core_sections))
-    for course, section in core_sections:
-        if course.number not in added_courses and all(
-            not sections_overlap(section, existing) for existing in final_sections
-        ):
-            final_sections.append(section)
-            added_courses.add(course.number)
-        if len(final_sections) >= max_core:
-            break
-
-    # 2. Fill remaining slots prioritizing interests
-    remaining_slots = 5 - len(final_sections)
-    if remaining_slots > 0 and elective_sections:
-        ranked_electives = gpt_rank_courses(
-            elective_sections, user.interests, remaining_slots
+        results.append(
+            {
+                "user_id": user_id,
+                "schedules": schedule_payloads(
+                    user_id, schedule_ids[user_id], solutions
+                ),
+                "solve_ms": round(solve_ms, 3),
+            }
         )
-        for course, section in ranked_electives:
-            if (
-                course.number not in added_courses
-                and len(final_sections) < 5
-                and all(
-                    not sections_overlap(section, existing)
-                    for existing in final_sections
-                )
-            ):
-                final_sections.append(section)
-                added_courses.add(course.number)
-
-    # 3. Only consider grad classes if they've completed 3+ core classes
-    remaining_slots = 5 - len(final_sections)
-    if remaining_slots > 0 and num_core_completed >= 3 and grad_sections:
-        for course, section in grad_sections:
-            if (
-                course.number not in added_courses
-                and len(final_sections) < 5
-                and all(
-                    not sections_overlap(section, existing)
-                    for existing in final_sections
-                )
-            ):
-                final_sections.append(section)
-                added_courses.add(course.number)
-
-    # Create the schedule
-    new_schedule = GeneratedSchedule(
-        user_id=user_id,
-        # score=1.0,
-        rationale="Prioritized core classes, then ranked electives, then grad-level if eligible.",
+
+    metrics.observe_stages(
+        {
+            "load": load_ms,
+            "filter": stats["timing"]["pool_ms"],
+            "rank": stats["timing"]["rank_ms"],
+            "solve": stats["timing"]["solve_ms"],
+            "persist": persist_ms,
+        },
+        "batch",
+    )
+    timing = {name: round(ms, 3) for name, ms in stats["timing"].items()}
+    timing["load_ms"] = round(load_ms, 3)
+    timing["persist_ms"] = round(persist_ms, 3)
+    timing["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return success_response(
+        {
+            "results": results,
+            "ranking_calls": stats["ranking_calls"],
+            "timing": timing,
+        },
+        201,
     )
-    db.session.add(new_schedule)
-    db.session.commit()
 
-    for sec in final_sections:
-        db.session.add(ScheduleSection(schedule_id=new_schedule.id, section_id=sec.id))
 
-    db.session.commit()
-    return success_response(new_schedule.serialize(), 201)
+@schedules_bp.route("/jobs/<int:job_id>/")
+def get_job(job_id):
+    """
+    Status and, once finished, result of a queued generation job.
+    """
+    job = GenerationJob.query.get(job_id)
+    if job is None:
+        return failure_response("Job not found")
+    return success_response(job.serialize())
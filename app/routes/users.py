@@ -1,7 +1,18 @@
 import json
 from flask import Blueprint, request
 from app.models import db, User, CompletedCourse
-from ..utils import success_response, failure_response
+from ..utils import (
+    course_number,
+    success_response,
+    failure_response,
+    stream_response,
+    wants_stream,
+)
+from ..availability import apply_availability, display_availability
+from ..candidates import get_pool_cache
+from ..catalog import get_catalog
+from ..pagination import fetch_limit, page_body, page_params, wants_page
+from ..serializers import USER_FIELDS, iter_users, serialize_users, user_load_options
 
 users_bp = Blueprint("users", __name__, url_prefix="/users")
 
@@ -20,12 +31,11 @@ def create_user():
     if None in (netid, grad_year, availability):
         return failure_response("Missing required fields", code=400)
 
-    new_user = User(
-        netid=netid,
-        graduation_year=grad_year,
-        interests=interests,
-        availability=availability,
-    )
+    new_user = User(netid=netid, graduation_year=grad_year, interests=interests)
+    try:
+        apply_availability(new_user, availability)
+    except ValueError as e:
+        return failure_response(str(e), code=400)
     db.session.add(new_user)
     db.session.commit()
 
@@ -36,10 +46,22 @@ def create_user():
 def all_users():
     """
     Return a list of all users.
-    """
-
-    users = [user.serialize() for user in User.query.all()]
-    return success_response({"users": users})
+    Add ?limit=&after= to page through them and ?fields= to pick fields,
+    or ?stream=1 to stream the list instead of building it in memory.
+    """
+    try:
+        params = page_params(USER_FIELDS, "id")
+    except ValueError as e:
+        return failure_response(str(e), code=400)
+    if wants_page(params):
+        criteria = [] if params.after is None else [User.id > params.after]
+        users = serialize_users(
+            *criteria, limit=fetch_limit(params), fields=params.fields
+        )
+        return success_response(page_body("users", users, params, "id"))
+    if wants_stream():
+        return stream_response("users", iter_users())
+    return success_response({"users": serialize_users()})
 
 
 @users_bp.route("/<int:user_id>/")
@@ -47,7 +69,7 @@ def get_user(user_id):
     """
     Get user profile by ID.
     """
-    user = User.query.filter_by(id=user_id).first()
+    user = User.query.options(*user_load_options()).filter_by(id=user_id).first()
     if user is None:
         return failure_response("User not found.")
     return success_response(user.serialize())
@@ -82,9 +104,15 @@ def update_user(user_id):
     if interests is not None:
         user.interests = interests
     if availability is not None:
-        user.availability = availability
+        try:
+            apply_availability(user, availability)
+        except ValueError as e:
+            db.session.rollback()
+            return failure_response(str(e), code=400)
 
     db.session.commit()
+    if availability is not None:
+        get_pool_cache().availability_changed(user_id)
     return success_response(user.serialize())
 
 
@@ -93,12 +121,13 @@ def delete_user(user_id):
     """
     Delete a user and all their data.
     """
-    user = User.query.filter_by(id=user_id).first()
+    user = User.query.options(*user_load_options()).filter_by(id=user_id).first()
     if user is None:
         return failure_response("User not found.")
 
     db.session.delete(user)
     db.session.commit()
+    get_pool_cache().discard(user_id)
 
     return success_response(user.serialize())
 
@@ -127,22 +156,23 @@ def add_completion(user_id):
         return failure_response("User not found.")
 
     body = json.loads(request.data)
-    course_number = body.get("course_number")
-    if course_number is None:
+    number = body.get("course_number")
+    if number is None:
         return failure_response("Must provide a course_number field.", code=400)
 
-    if course_number[:3] != "CS ":
-        return failure_response(
-            "Course number must start with 'CS ' followed by the number.", code=400
-        )
-    completion = CompletedCourse(user_id=user_id, course_number=str(course_number))
+    try:
+        number = course_number(number)
+    except ValueError as e:
+        return failure_response(str(e), code=400)
+    completion = CompletedCourse(user_id=user_id, course_number=number)
     db.session.add(completion)
     db.session.commit()
+    get_pool_cache().completion_added(user_id, get_catalog(), completion.course_number)
     return success_response(completion.serialize(), code=201)
 
 
-@users_bp.route("/<int:user_id>/completions/<int:course_number>", methods=["DELETE"])
-def remove_completion(user_id, course_number):
+@users_bp.route("/<int:user_id>/completions/<number>", methods=["DELETE"])
+def remove_completion(user_id, number):
     """
     Remove a completed course from this user.
     """
@@ -150,15 +180,19 @@ def remove_completion(user_id, course_number):
     if user is None:
         return failure_response("User not found.")
 
-    course_number = "CS " + str(course_number)
+    try:
+        number = course_number(number)
+    except ValueError as e:
+        return failure_response(str(e), code=400)
     completion = CompletedCourse.query.filter_by(
-        user_id=user_id, course_number=course_number
+        user_id=user_id, course_number=number
     ).first()
     if completion is None:
         return failure_response("User has not completed that course.")
 
     db.session.delete(completion)
     db.session.commit()
+    get_pool_cache().completion_removed(user_id, get_catalog(), number)
 
     return success_response(completion.serialize())
 
@@ -167,6 +201,7 @@ def remove_completion(user_id, course_number):
 def set_availability(user_id):
     """
     Set or update the user's availability bitmask.
+    Accepts the legacy hourly bit string or a list of free windows.
     """
 
     user = User.query.filter_by(id=user_id).first()
@@ -178,8 +213,12 @@ def set_availability(user_id):
     if availability is None:
         return failure_response("Did not provide availability.", code=400)
 
-    user.availability = availability
+    try:
+        apply_availability(user, availability)
+    except ValueError as e:
+        return failure_response(str(e), code=400)
     db.session.commit()
+    get_pool_cache().availability_changed(user_id)
 
     return success_response(user.serialize(), code=201)
 
@@ -193,4 +232,4 @@ def get_availability(user_id):
     if user is None:
         return failure_response("User not found.")
 
-    return success_response({"availability": user.availability})
+    return success_response({"availability": display_availability(user.availability)})
@@ -0,0 +1,201 @@
+import hashlib
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.models import db, GeneratedSchedule, ScheduleSection
+
+"""
+Deduplicated schedule storage.
+
+A schedule is identified by a hash of its sorted section ids, and each user
+has at most one schedule per hash (a unique index on user_id, content_hash).
+Generating a schedule the user already has updates that row's score and
+rationale instead of adding another one, so a user's schedule list grows
+with distinct schedules, not with clicks. Every save is one transaction of
+bulk statements, however many users and schedules it covers.
+
+Rows saved before the hash existed are hashed (and merged when they turn out
+to be duplicates) by backfill_schedule_hashes at startup. sync-catalog
+re-hashes schedules whose sections it removes.
+"""
+
+# Ids per IN (...) clause, to stay below the database's parameter limits
+CHUNK_SIZE = 500
+
+Table = GeneratedSchedule.__table__
+
+
+def schedule_hash(section_ids):
+    ids = ",".join(str(i) for i in sorted(set(section_ids)))
+    return hashlib.sha1(ids.encode()).hexdigest()
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _schedule_ids(user_ids):
+    """
+    {(user_id, content_hash): schedule id} for every hashed schedule of
+    these users.
+    """
+    found = {}
+    for chunk in _chunks(user_ids):
+        rows = db.session.execute(
+            select(Table.c.id, Table.c.user_id, Table.c.content_hash).where(
+                Table.c.user_id.in_(chunk), Table.c.content_hash.isnot(None)
+            )
+        )
+        for row in rows:
+            found[(row.user_id, row.content_hash)] = row.id
+    return found
+
+
+def _write(wanted, rationale):
+    existing = _schedule_ids({user_id for user_id, _ in wanted})
+    saved = {key: existing[key] for key in wanted if key in existing}
+    new = [key for key in wanted if key not in existing]
+
+    if saved:
+        db.session.execute(
+            update(Table)
+            .where(Table.c.id == bindparam("b_id"))
+            .values(score=bindparam("score"), rationale=bindparam("rationale")),
+            [
+                {"b_id": schedule_id, "score": wanted[key][0], "rationale": rationale}
+                for key, schedule_id in saved.items()
+            ],
+        )
+    if new:
+        db.session.execute(
+            insert(Table),
+            [
+                {
+                    "user_id": user_id,
+                    "content_hash": content_hash,
+                    "score": wanted[(user_id, content_hash)][0],
+                    "rationale": rationale,
+                }
+                for user_id, content_hash in new
+            ],
+        )
+        created = _schedule_ids({user_id for user_id, _ in new})
+        db.session.execute(
+            insert(ScheduleSection.__table__),
+            [
+                {"schedule_id": created[key], "section_id": section_id}
+                for key in new
+                for section_id in sorted(set(wanted[key][1]))
+            ],
+        )
+        saved.update((key, created[key]) for key in new)
+    return saved
+
+
+def save_schedules(solutions_by_user, rationale):
+    """
+    Store solver solutions, {user_id: [Solution]}, in one transaction and
+    return {user_id: [schedule id per solution]}. A solution the user already
+    has a schedule for reuses that schedule.
+    """
+    wanted = {}
+    keys = {}
+    for user_id, solutions in solutions_by_user.items():
+        keys[user_id] = []
+        for solution in solutions:
+            section_ids = [sec.id for sec in solution.sections]
+            key = (user_id, schedule_hash(section_ids))
+            wanted.setdefault(key, (solution.score, section_ids))
+            keys[user_id].append(key)
+    if not wanted:
+        return {user_id: [] for user_id in keys}
+
+    for attempt in range(2):
+        try:
+            saved = _write(wanted, rationale)
+            db.session.commit()
+            break
+        except IntegrityError:
+            # a concurrent request saved the same schedule first; it is
+            # found as existing on the retry
+            db.session.rollback()
+            if attempt:
+                raise
+    return {user_id: [saved[key] for key in ks] for user_id, ks in keys.items()}
+
+
+def rehash_schedules(schedule_ids=None):
+    """
+    Recompute the content hash of some schedules (default: every schedule
+    without one) and delete those that now duplicate another schedule of the
+    same user, keeping the oldest. Does not commit. Returns how many were
+    deleted.
+    """
+    query = select(Table.c.id, Table.c.user_id)
+    if schedule_ids is None:
+        rows = db.session.execute(query.where(Table.c.content_hash.is_(None))).all()
+    else:
+        rows = [
+            row
+            for chunk in _chunks(schedule_ids)
+            for row in db.session.execute(query.where(Table.c.id.in_(chunk)))
+        ]
+    if not rows:
+        return 0
+
+    sections = {row.id: [] for row in rows}
+    for chunk in _chunks(sections):
+        for schedule_id, section_id in db.session.execute(
+            select(ScheduleSection.schedule_id, ScheduleSection.section_id).where(
+                ScheduleSection.schedule_id.in_(chunk)
+            )
+        ):
+            sections[schedule_id].append(section_id)
+
+    # clear the old hashes first so no intermediate state breaks uniqueness
+    for chunk in _chunks(sections):
+        db.session.execute(
+            update(Table).where(Table.c.id.in_(chunk)).values(content_hash=None)
+        )
+    owners = {row.id: row.user_id for row in rows}
+    keep = _schedule_ids(set(owners.values()))
+    duplicates, hashes = [], []
+    for schedule_id in sorted(sections):
+        key = (owners[schedule_id], schedule_hash(sections[schedule_id]))
+        if key in keep and keep[key] != schedule_id:
+            if keep[key] > schedule_id:
+                duplicates.append(keep[key])
+                keep[key] = schedule_id
+                hashes.append({"b_id": schedule_id, "content_hash": key[1]})
+            else:
+                duplicates.append(schedule_id)
+            continue
+        keep[key] = schedule_id
+        hashes.append({"b_id": schedule_id, "content_hash": key[1]})
+
+    for chunk in _chunks(duplicates):
+        db.session.execute(
+            delete(ScheduleSection).where(ScheduleSection.schedule_id.in_(chunk))
+        )
+        db.session.execute(delete(Table).where(Table.c.id.in_(chunk)))
+    deleted = set(duplicates)
+    hashes = [h for h in hashes if h["b_id"] not in deleted]
+    if hashes:
+        db.session.execute(
+            update(Table)
+            .where(Table.c.id == bindparam("b_id"))
+            .values(content_hash=bindparam("content_hash")),
+            hashes,
+        )
+    return len(duplicates)
+
+
+def backfill_schedule_hashes():
+    """
+    Hash schedules saved before content_hash existed. Called at startup.
+    """
+    deleted = rehash_schedules()
+    db.session.commit()
+    if deleted:
+        print(f"Merged {deleted} duplicate schedules")
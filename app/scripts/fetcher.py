@@ -0,0 +1,190 @@
+import gzip
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+"""
+Concurrent roster fetcher.
+
+Fetches every subject of one roster (term) from the class roster API in
+parallel through one pooled requests.Session that retries with backoff on errors and
+rate limits. Each response is parsed as it streams in: the classes array is
+decoded one object at a time and written straight to a per-subject gzip file,
+so a large subject never sits in memory as a single JSON document.
+
+ETag and Last-Modified validators are kept next to the per-subject files and
+sent back as conditional headers; a 304 reuses the file from the last run.
+The per-subject files are then concatenated into the roster snapshot that
+seed-all and sync-catalog read (see scraper.load_roster). A snapshot holds a
+single term: sections carry no term, so mixing rosters would let a schedule
+combine sections of different semesters.
+
+ROSTER_API_BASE points the fetcher at another server, eg. a local stand-in
+for tests.
+"""
+
+DEFAULT_API_BASE = "https://classes.cornell.edu/api/2.0"
+CHUNK_SIZE = 64 * 1024
+REQUEST_TIMEOUT = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+VALIDATORS_FILENAME = "validators.json"
+
+
+def make_session(workers, retries=3, backoff=0.5):
+    """
+    Session with a connection pool sized for `workers` threads and retries
+    with exponential backoff (honouring Retry-After).
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=workers, pool_maxsize=workers, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def iter_json_array(chunks, key="classes"):
+    """
+    Yield the items of the array stored under `key` in a JSON document that
+    arrives as an iterable of text chunks, without decoding the whole
+    document at once.
+    """
+    decoder = json.JSONDecoder()
+    marker = f'"{key}"'
+    chunks = iter(chunks)
+    buf = ""
+    while True:
+        start = buf.find(marker)
+        if start >= 0:
+            bracket = buf.find("[", start + len(marker))
+            if bracket >= 0:
+                buf = buf[bracket + 1 :]
+                break
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        buf += chunk
+
+    while True:
+        buf = buf.lstrip(" \t\r\n,")
+        if buf.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buf)
+        except ValueError:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("Truncated roster response")
+            buf += chunk
+            continue
+        yield item
+        buf = buf[end:]
+
+
+class RosterFetcher:
+    """
+    Fetches the subjects of a roster into cache_dir and merges them into one
+    gzip JSON-lines snapshot.
+    """
+
+    def __init__(self, base_url, cache_dir, workers=4):
+        self.base_url = base_url.rstrip("/")
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.session = make_session(self.workers)
+        self.validators_path = os.path.join(cache_dir, VALIDATORS_FILENAME)
+        self.validators = {}
+        if os.path.exists(self.validators_path):
+            with open(self.validators_path) as f:
+                self.validators = json.load(f)
+
+    def subject_path(self, roster, subject):
+        return os.path.join(self.cache_dir, f"{roster}_{subject}.jsonl.gz")
+
+    def fetch_subject(self, roster, subject):
+        """
+        Fetch one subject into its cache file. Returns True when new data was
+        downloaded and False when the server answered 304.
+        """
+        key = f"{roster}/{subject}"
+        path = self.subject_path(roster, subject)
+        headers = {}
+        validator = self.validators.get(key)
+        if validator and os.path.exists(path):
+            if validator.get("etag"):
+                headers["If-None-Match"] = validator["etag"]
+            if validator.get("last_modified"):
+                headers["If-Modified-Since"] = validator["last_modified"]
+
+        with self.session.get(
+            f"{self.base_url}/search/classes.json",
+            params={"roster": roster, "subject": subject},
+            headers=headers,
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        ) as response:
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+            tmp = path + ".tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                chunks = response.iter_content(CHUNK_SIZE, decode_unicode=True)
+                for clss in iter_json_array(chunks):
+                    clss.setdefault("subject", subject)
+                    f.write(json.dumps(clss, separators=(",", ":")))
+                    f.write("\n")
+            os.replace(tmp, path)
+            self.validators[key] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+        return True
+
+    def fetch(self, roster, subjects, snapshot):
+        """
+        Fetch every subject of `roster` with bounded parallelism and write
+        the merged snapshot. Returns how many were downloaded and how many
+        were not modified.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pairs = [(roster, subject) for subject in subjects]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            fresh = list(pool.map(lambda pair: self.fetch_subject(*pair), pairs))
+
+        tmp = self.validators_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.validators, f)
+        os.replace(tmp, self.validators_path)
+
+        os.makedirs(os.path.dirname(os.path.abspath(snapshot)), exist_ok=True)
+        tmp = snapshot + ".tmp"
+        with open(tmp, "wb") as out:
+            for roster, subject in pairs:
+                # gzip members can be concatenated into one valid gzip file
+                with open(self.subject_path(roster, subject), "rb") as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp, snapshot)
+        return {"downloaded": sum(fresh), "not_modified": len(fresh) - sum(fresh)}
+
+
+def get_fetcher():
+    config = current_app.config
+    return RosterFetcher(
+        config.get("ROSTER_API_BASE") or DEFAULT_API_BASE,
+        os.path.join(current_app.instance_path, "roster_cache"),
+        workers=config.get("ROSTER_FETCH_WORKERS", 4),
+    )
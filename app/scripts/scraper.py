@@ -1,11 +1,22 @@
-import requests
+import gzip
+import json
+import os
 import re
 from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, insert, update
 from app.models import db, Course, CoursePrereq, CourseSection, CoreClass
+from app.prereqs import parse_requirements
+from .fetcher import get_fetcher
 
 """
 Scraper that goes through the cornell CS catalogue using the cornell API 
 and adds relevant details to their respective tables.
+
+The roster is only fetched when seeding (see fetcher.py for the download
+itself), and is saved as a gzip JSON-lines snapshot (one class per line) so
+later seeds and fresh environments can load it from disk instead of
+downloading it again. The snapshot is read back lazily, one class at a time.
 """
 
 # ------- WEB SCRAPER --------
@@ -14,6 +25,7 @@ and adds relevant details to their respective tables.
 # - Name (eg. "Introduction to computing")
 # - Decription (eg. "This course focuses on...")
 # - Credits (eg. 4)
+# - Prereq tree (eg. {"or": ["CS 1110", "CS 1112"]}, see app/prereqs.py)
 #
 # In terms of CoursePrereq:
 #  - Number
@@ -26,9 +38,31 @@ and adds relevant details to their respective tables.
 #  - Start_time (in minutes since 00:00)
 #  - End_time (in minutes since 00:00)
 
-API_URL = (
-    "https://classes.cornell.edu/api/2.0/search/classes.json?roster=FA24&subject=CS"
-)
+SNAPSHOT_FILENAME = "roster.jsonl.gz"
+
+# Requirements of the courses whose flat prereq rows are wrong, used for
+# databases seeded before prereq_tree existed when no roster snapshot is
+# around to parse. Each entry lists groups that are all required, any one
+# course of a group meeting it.
+LEGACY_PREREQ_RULES = {
+    "CS 2110": [["CS 1110", "CS 1112"]],
+    "CS 2112": [["CS 1110", "CS 1112"]],
+    "CS 3110": [["CS 2110"], ["CS 2800", "CS 2802"]],
+    "CS 3700": [["CS 2110"], ["CS 2800", "CS 2802"]],
+    "CS 4410": [["CS 3410", "CS 3420"]],
+    "CS 4414": [["CS 3410", "CS 3420"]],
+}
+
+# The 7 core requirements; any one course of a requirement meets it
+CORE_REQUIREMENTS = {
+    "Intro programming": ("CS 1110", "CS 1112"),
+    "Data structures": ("CS 2110",),
+    "Discrete structures": ("CS 2800",),
+    "Functional programming": ("CS 3110",),
+    "Computer systems": ("CS 3410", "CS 3420"),
+    "Operating systems": ("CS 4410", "CS 4414"),
+    "Algorithms": ("CS 4820",),
+}
 
 
 def time_to_min(time):
@@ -57,74 +91,106 @@ def extract_prereqs(text):
     return [f"{dept} {num}" for dept, num in matches]
 
 
-def get_data_ready():
+def course_number(clss):
     """
-    Prepares the data for man handling.
+    Course number of a roster class, eg. "CS 1110".
     """
-    raw_data = requests.get(API_URL)
-    raw_data.raise_for_status()
-    data = raw_data.json()["data"]["classes"]
+    return f"{clss.get('subject', 'CS')} {clss['catalogNbr']}"
 
-    return data
 
+def snapshot_path():
+    return current_app.config.get("ROSTER_SNAPSHOT") or os.path.join(
+        current_app.instance_path, SNAPSHOT_FILENAME
+    )
 
-data = get_data_ready()
 
+def save_snapshot(data, path):
+    """
+    Write the roster as gzip JSON lines.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for clss in data:
+            f.write(json.dumps(clss, separators=(",", ":")))
+            f.write("\n")
+    os.replace(tmp, path)
 
-def seed_courses():
+
+class Snapshot:
     """
-    Adds all courses to the database.
+    Iterable over the classes in a snapshot file. Every iteration reads the
+    file again, so the roster is never held in memory as a whole.
     """
-    if Course.query.first():
-        return
-    for clss in data:
-        num = f"CS {clss['catalogNbr']}"
-        name = clss.get("titleLong", "").strip()
-        description = clss.get("description", "").strip()
-        credits = int(float(clss["enrollGroups"][0].get("unitsMinimum", 0)))
-
-        course = db.session.get(Course, num)
-        if not course:
-            course = Course(
-                number=num, name=name, description=description, credits=credits
-            )
-            db.session.add(course)
 
-    db.session.commit()
+    def __init__(self, path):
+        self.path = path
 
+    def __iter__(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
 
-def seed_prereq():
+
+def load_roster(path=None, refresh=False):
     """
-    Adds prereqs to the database.
+    Roster classes from the snapshot at `path` (default: ROSTER_SNAPSHOT or
+    the instance folder). The API is only called when there is no snapshot
+    yet or `refresh` is set, and the result is saved to the snapshot.
     """
-    if CoursePrereq.query.first():
-        return
+    path = path or snapshot_path()
+    if refresh or not os.path.exists(path):
+        config = current_app.config
+        stats = get_fetcher().fetch(
+            config["ROSTER"], config["ROSTER_SUBJECTS"], path
+        )
+        print(
+            f"Roster: {stats['downloaded']} subjects downloaded, "
+            f"{stats['not_modified']} not modified"
+        )
+    return Snapshot(path)
+
+
+def parse_courses(data):
+    """
+    Course rows from the roster, keyed by number (first listing wins).
+    """
+    courses = {}
     for clss in data:
-        num = f"CS {clss['catalogNbr']}"
-        prereq_text = clss.get("catalogPrereqCoreq", "")
-
-        for prereq in extract_prereqs(prereq_text):
-            exists = (
-                db.session.query(CoursePrereq)
-                .filter_by(course_number=num, prereq_number=prereq)
-                .first()
-            )
-            if not exists:
-                real_prereq = CoursePrereq(course_number=num, prereq_number=prereq)
-                db.session.add(real_prereq)
-    db.session.commit()
+        num = course_number(clss)
+        if num in courses:
+            continue
+        tree = parse_requirements(clss.get("catalogPrereqCoreq", ""))
+        courses[num] = {
+            "number": num,
+            "name": clss.get("titleLong", "").strip(),
+            "description": clss.get("description", "").strip(),
+            "credits": int(float(clss["enrollGroups"][0].get("unitsMinimum", 0))),
+            "prereq_tree": json.dumps(tree) if tree is not None else None,
+        }
+    return courses
 
 
-def seed_schedules():
+def parse_prereqs(data):
     """
-    Adds the sections into the database.
+    Set of (course_number, prereq_number) pairs from the roster.
     """
-    if CourseSection.query.first():
-        return
+    pairs = set()
+    for clss in data:
+        num = course_number(clss)
+        for prereq in extract_prereqs(clss.get("catalogPrereqCoreq", "")):
+            pairs.add((num, prereq))
+    return pairs
 
+
+def parse_sections(data):
+    """
+    Section rows (one per meeting) from the roster, in roster order.
+    """
+    rows = []
     for clss in data:
-        catalog = clss["catalogNbr"]
-        num = f"CS {catalog}"
+        num = course_number(clss)
         group = clss.get("enrollGroups", [])
         for sec in group[0].get("classSections", []):
             label = sec.get("ssrComponent", "").strip()
@@ -144,14 +210,54 @@ def seed_schedules():
                     )
                     continue
 
-                course_section = CourseSection(
-                    course_number=num,
-                    section=section_label,
-                    days=days or "TBA",
-                    start_min=start,
-                    end_min=end,
+                rows.append(
+                    {
+                        "course_number": num,
+                        "section": section_label,
+                        "days": days or "TBA",
+                        "start_min": start,
+                        "end_min": end,
+                    }
                 )
-                db.session.add(course_section)
+    return rows
+
+
+def seed_courses(data):
+    """
+    Adds all courses to the database.
+    """
+    if Course.query.first():
+        return
+    rows = list(parse_courses(data).values())
+    if rows:
+        db.session.execute(insert(Course.__table__), rows)
+    db.session.commit()
+
+
+def seed_prereq(data):
+    """
+    Adds prereqs to the database.
+    """
+    if CoursePrereq.query.first():
+        return
+    rows = [
+        {"course_number": num, "prereq_number": prereq}
+        for num, prereq in sorted(parse_prereqs(data))
+    ]
+    if rows:
+        db.session.execute(insert(CoursePrereq.__table__), rows)
+    db.session.commit()
+
+
+def seed_schedules(data):
+    """
+    Adds the sections into the database.
+    """
+    if CourseSection.query.first():
+        return
+    rows = parse_sections(data)
+    if rows:
+        db.session.execute(insert(CourseSection.__table__), rows)
     db.session.commit()
 
 
@@ -162,20 +268,74 @@ def seed_core():
     """
     if CoreClass.query.first():
         return
-    core_courses = [
-        CoreClass(course_number="CS 1110"),
-        CoreClass(course_number="CS 1112"),
-        CoreClass(course_number="CS 2110"),
-        CoreClass(course_number="CS 2800"),
-        CoreClass(course_number="CS 3110"),
-        CoreClass(course_number="CS 3410"),
-        CoreClass(course_number="CS 3420"),
-        CoreClass(course_number="CS 4410"),
-        CoreClass(course_number="CS 4414"),
-        CoreClass(course_number="CS 4820"),
-    ]
-    for course in core_courses:
-        if not CoreClass.query.filter_by(course_number=course.course_number).first():
-            db.session.add(course)
+    db.session.add_all(
+        CoreClass(course_number=number, requirement=name)
+        for name, numbers in CORE_REQUIREMENTS.items()
+        for number in numbers
+    )
+    db.session.commit()
 
+
+def backfill_core_requirements():
+    """
+    Name the requirement of core rows seeded before requirements existed:
+    the standard one from CORE_REQUIREMENTS, or else the course itself.
+    Called at startup.
+    """
+    rows = CoreClass.query.filter(CoreClass.requirement.is_(None)).all()
+    if not rows:
+        return
+    known = {
+        number: name
+        for name, numbers in CORE_REQUIREMENTS.items()
+        for number in numbers
+    }
+    for row in rows:
+        row.requirement = known.get(row.course_number, row.course_number)
     db.session.commit()
+
+
+def rule_tree(groups):
+    """
+    LEGACY_PREREQ_RULES entry -> requirement tree (see app/prereqs.py).
+    """
+    terms = [group[0] if len(group) == 1 else {"or": group} for group in groups]
+    return terms[0] if len(terms) == 1 else {"and": terms}
+
+
+def backfill_prereq_trees():
+    """
+    Fill in prereq_tree on databases seeded before it existed, where every
+    course still has none: parsed from the roster snapshot when there is
+    one, else from LEGACY_PREREQ_RULES. Courses left without a tree need all
+    their prereq rows. Called at startup.
+    """
+    if Course.query.filter(Course.prereq_tree.isnot(None)).first():
+        return
+    numbers = {num for (num,) in db.session.query(Course.number)}
+    if not numbers:
+        return
+    trees = {
+        num: rule_tree(groups)
+        for num, groups in LEGACY_PREREQ_RULES.items()
+        if num in numbers
+    }
+    path = snapshot_path()
+    if os.path.exists(path):
+        trees.update(
+            (num, json.loads(row["prereq_tree"]))
+            for num, row in parse_courses(Snapshot(path)).items()
+            if num in numbers and row["prereq_tree"]
+        )
+    if trees:
+        db.session.execute(
+            update(Course.__table__)
+            .where(Course.__table__.c.number == bindparam("b_number"))
+            .values(prereq_tree=bindparam("prereq_tree")),
+            [
+                {"b_number": num, "prereq_tree": json.dumps(tree)}
+                for num, tree in trees.items()
+            ],
+        )
+        db.session.commit()
+        print(f"Filled in {len(trees)} prerequisite trees")
@@ -1,14 +1,32 @@
 from flask.cli import with_appcontext
 import click
 from app.models import db
-from ..scripts.scraper import seed_courses, seed_core, seed_prereq, seed_schedules
+from app.catalog import bump_catalog_version, rebuild_catalog
+from app.ranker import rebuild_tfidf_index
+from ..scripts.scraper import (
+    load_roster,
+    seed_courses,
+    seed_core,
+    seed_prereq,
+    seed_schedules,
+)
 
 
 @click.command("seed-all")
+@click.option(
+    "--snapshot",
+    type=click.Path(dir_okay=False),
+    help="Roster snapshot to seed from; downloaded and saved there if missing.",
+)
+@click.option("--refresh", is_flag=True, help="Download the roster again.")
 @with_appcontext
-def seed_all():
+def seed_all(snapshot, refresh):
     db.create_all()
-    seed_courses()
+    data = load_roster(snapshot, refresh)
+    seed_courses(data)
     seed_core()
-    seed_prereq()
-    seed_schedules()
+    seed_prereq(data)
+    seed_schedules(data)
+    bump_catalog_version()
+    catalog = rebuild_catalog()
+    rebuild_tfidf_index(catalog)
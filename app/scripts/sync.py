@@ -0,0 +1,251 @@
+from flask.cli import with_appcontext
+import click
+from sqlalchemy import bindparam, delete, insert, tuple_, update
+from app.models import (
+    db,
+    Course,
+    CoursePrereq,
+    CourseSection,
+    ScheduleSection,
+    CompletedCourse,
+    CoreClass,
+)
+from app.catalog import bump_catalog_version, rebuild_catalog
+from app.schedule_store import rehash_schedules
+from app.ranker import rebuild_tfidf_index
+from ..scripts.scraper import (
+    load_roster,
+    parse_courses,
+    parse_prereqs,
+    parse_sections,
+    seed_core,
+)
+
+"""
+Incremental catalog sync.
+
+seed-all only fills empty tables. sync-catalog compares a (new) roster with
+what is in the database and applies just the difference: bulk inserts,
+executemany updates and deletes, all in one transaction. Sections keep
+their ids when only their days or times change, so saved schedules keep
+pointing at them. Deleted sections are also removed from saved schedules,
+which are then re-hashed (see app/schedule_store.py).
+Courses that left the roster are kept while a user has completed them or
+they are core, since those rows point at them.
+When anything changed the catalog version is bumped, which invalidates the
+in-process catalog index and the cached catalog responses.
+"""
+
+COURSE_FIELDS = ("name", "description", "credits", "prereq_tree")
+SECTION_FIELDS = ("days", "start_min", "end_min")
+
+
+def _counts():
+    return {"inserted": 0, "updated": 0, "deleted": 0}
+
+
+def section_keys(rows):
+    """
+    Pair each section row with a stable key: (course, section label, n) where
+    n counts earlier meetings of the same section, since one section can
+    have several meeting rows.
+    """
+    seen = {}
+    keyed = {}
+    for row in rows:
+        label = (row["course_number"], row["section"])
+        n = seen.get(label, 0)
+        seen[label] = n + 1
+        keyed[label + (n,)] = row
+    return keyed
+
+
+def sync_courses(wanted):
+    """
+    Insert and update courses. Returns the counts and the numbers of courses
+    no longer in the roster, which delete_courses removes once nothing in
+    the catalog points at them.
+    """
+    counts = _counts()
+    current = {
+        row.number: row
+        for row in db.session.query(
+            Course.number,
+            Course.name,
+            Course.description,
+            Course.credits,
+            Course.prereq_tree,
+        )
+    }
+    new = [row for num, row in wanted.items() if num not in current]
+    changed = [
+        {"b_number": num, **{f: row[f] for f in COURSE_FIELDS}}
+        for num, row in wanted.items()
+        if num in current
+        and any(getattr(current[num], f) != row[f] for f in COURSE_FIELDS)
+    ]
+    gone = [num for num in current if num not in wanted]
+
+    if new:
+        db.session.execute(insert(Course.__table__), new)
+    if changed:
+        db.session.execute(
+            update(Course.__table__)
+            .where(Course.__table__.c.number == bindparam("b_number"))
+            .values({f: bindparam(f) for f in COURSE_FIELDS}),
+            changed,
+        )
+    counts.update(inserted=len(new), updated=len(changed))
+    return counts, gone
+
+
+def delete_courses(numbers):
+    referenced = {
+        num
+        for (num,) in db.session.query(CompletedCourse.course_number)
+        .filter(CompletedCourse.course_number.in_(numbers))
+        .union(
+            db.session.query(CoreClass.course_number).filter(
+                CoreClass.course_number.in_(numbers)
+            )
+        )
+    }
+    gone = [num for num in numbers if num not in referenced]
+    if gone:
+        db.session.execute(delete(Course).where(Course.number.in_(gone)))
+    return len(gone)
+
+
+def sync_sections(wanted_rows):
+    counts = _counts()
+    wanted = section_keys(wanted_rows)
+    current_rows = db.session.query(
+        CourseSection.id,
+        CourseSection.course_number,
+        CourseSection.section,
+        CourseSection.days,
+        CourseSection.start_min,
+        CourseSection.end_min,
+    ).order_by(CourseSection.id)
+    current = section_keys(row._asdict() for row in current_rows)
+
+    new = [row for key, row in wanted.items() if key not in current]
+    changed = [
+        {"b_id": current[key]["id"], **{f: row[f] for f in SECTION_FIELDS}}
+        for key, row in wanted.items()
+        if key in current
+        and any(current[key][f] != row[f] for f in SECTION_FIELDS)
+    ]
+    gone = [row["id"] for key, row in current.items() if key not in wanted]
+
+    if new:
+        db.session.execute(insert(CourseSection.__table__), new)
+    if changed:
+        db.session.execute(
+            update(CourseSection.__table__)
+            .where(CourseSection.__table__.c.id == bindparam("b_id"))
+            .values({f: bindparam(f) for f in SECTION_FIELDS}),
+            changed,
+        )
+    detached = 0
+    if gone:
+        affected = [
+            row.schedule_id
+            for row in db.session.query(ScheduleSection.schedule_id)
+            .filter(ScheduleSection.section_id.in_(gone))
+            .distinct()
+        ]
+        detached = db.session.execute(
+            delete(ScheduleSection).where(ScheduleSection.section_id.in_(gone))
+        ).rowcount
+        db.session.execute(delete(CourseSection).where(CourseSection.id.in_(gone)))
+        # their sections changed, so their hashes (and maybe duplicates) did too
+        rehash_schedules(affected)
+    counts.update(inserted=len(new), updated=len(changed), deleted=len(gone))
+    return counts, detached
+
+
+def sync_prereqs(wanted):
+    counts = _counts()
+    current = set(
+        db.session.query(CoursePrereq.course_number, CoursePrereq.prereq_number)
+    )
+    new = sorted(wanted - current)
+    gone = sorted(current - wanted)
+    if new:
+        db.session.execute(
+            insert(CoursePrereq.__table__),
+            [{"course_number": c, "prereq_number": p} for c, p in new],
+        )
+    if gone:
+        db.session.execute(
+            delete(CoursePrereq).where(
+                tuple_(CoursePrereq.course_number, CoursePrereq.prereq_number).in_(
+                    gone
+                )
+            )
+        )
+    counts.update(inserted=len(new), deleted=len(gone))
+    return counts
+
+
+def sync_catalog(data, dry_run=False):
+    """
+    Apply the difference between the roster and the catalog tables in one
+    transaction, and return the change counts.
+    """
+    report = {}
+    try:
+        report["courses"], gone = sync_courses(parse_courses(data))
+        report["sections"], report["schedule_sections_deleted"] = sync_sections(
+            parse_sections(data)
+        )
+        report["prereqs"] = sync_prereqs(parse_prereqs(data))
+        if gone:
+            report["courses"]["deleted"] = delete_courses(gone)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    changed = report["schedule_sections_deleted"] or any(
+        sum(report[table].values()) for table in ("courses", "sections", "prereqs")
+    )
+    if dry_run or not changed:
+        db.session.rollback()
+    else:
+        # commits the sync and the new version stamp together
+        report["version"] = bump_catalog_version()
+    report["changed"] = bool(changed)
+    return report
+
+
+@click.command("sync-catalog")
+@click.option(
+    "--snapshot",
+    type=click.Path(dir_okay=False),
+    help="Roster snapshot to sync from instead of downloading a fresh roster.",
+)
+@click.option("--dry-run", is_flag=True, help="Report the changes without applying.")
+@with_appcontext
+def sync_catalog_command(snapshot, dry_run):
+    db.create_all()
+    data = load_roster(snapshot, refresh=snapshot is None)
+    seed_core()
+    report = sync_catalog(data, dry_run=dry_run)
+    for table in ("courses", "sections", "prereqs"):
+        counts = report[table]
+        click.echo(
+            f"{table}: {counts['inserted']} inserted, {counts['updated']} updated, "
+            f"{counts['deleted']} deleted"
+        )
+    click.echo(
+        f"schedule sections removed: {report['schedule_sections_deleted']}"
+    )
+    if dry_run:
+        click.echo("dry run, nothing applied")
+    elif report["changed"]:
+        catalog = rebuild_catalog()
+        rebuild_tfidf_index(catalog)
+        click.echo(f"catalog version {report['version']}")
+    else:
+        click.echo("catalog already up to date")
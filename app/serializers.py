@@ -0,0 +1,298 @@
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.models import (
+    db,
+    User,
+    Course,
+    CompletedCourse,
+    GeneratedSchedule,
+    ScheduleSection,
+    CourseSection,
+)
+from .availability import display_availability
+from .pagination import project
+
+"""
+Serialization with loads planned up front.
+
+The model serialize() methods walk relationships lazily, which costs one
+query per row on list endpoints. The builders here fetch each table once as
+plain row tuples and assemble the same payloads, so the number of queries
+does not depend on how many rows are returned. The load options are for
+routes that still work with ORM objects.
+
+serialize_users/serialize_schedules/serialize_sections/serialize_courses take
+an optional limit and field projection for paginated requests (see
+app/pagination.py); nested lists that are not requested are not queried.
+
+Nested lists are looked up for the returned page by its literal ids rather
+than by `IN (SELECT ... LIMIT n)`, which MySQL does not support; a request
+without a limit uses the unlimited subquery, so its id list never grows
+with the table.
+
+The iter_* generators feed streamed responses: they read through a
+server-side cursor with yield_per, so only one batch of rows is in memory.
+"""
+
+
+def user_load_options():
+    """
+    Loader options for serializing User objects without per-row queries.
+    """
+    return (
+        selectinload(User.completed_courses),
+        selectinload(User.generated_schedules),
+    )
+
+
+def schedule_load_options():
+    """
+    Loader options for serializing GeneratedSchedule objects with sections.
+    (Built on demand: ScheduleSection.section is a backref that only exists
+    once the mappers are configured.)
+    """
+    return (
+        selectinload(GeneratedSchedule.schedule_sections).joinedload(
+            ScheduleSection.section
+        ),
+    )
+
+
+USER_FIELDS = (
+    "id",
+    "netid",
+    "graduation_year",
+    "interests",
+    "availability",
+    "completed_courses",
+    "generated_schedules",
+)
+COURSE_FIELDS = (
+    "number",
+    "name",
+    "description",
+    "credits",
+    "prereq_tree",
+    "sections",
+    "prereqs",
+    "required_by",
+)
+SECTION_FIELDS = ("id", "course_number", "section", "days", "start_min", "end_min")
+SCHEDULE_FIELDS = ("id", "user_id", "score", "rationale", "sections")
+
+
+def _wants(fields, name):
+    return fields is None or name in fields
+
+
+SECTION_COLUMNS = (
+    CourseSection.id,
+    CourseSection.course_number,
+    CourseSection.section,
+    CourseSection.days,
+    CourseSection.start_min,
+    CourseSection.end_min,
+)
+
+
+def _page_ids(rows, column, criteria, limit):
+    """
+    What to match nested rows against with IN (...): the ids of a page, or
+    the criteria as a subquery when there is no limit.
+    """
+    if limit is None:
+        return select(column).where(*criteria)
+    return [row.id for row in rows]
+
+
+def section_payload(row):
+    """
+    Same as CourseSection.serialize, from a row of SECTION_COLUMNS.
+    """
+    return {
+        "id": row.id,
+        "course_number": row.course_number,
+        "section": row.section,
+        "days": row.days,
+        "start_min": row.start_min,
+        "end_min": row.end_min,
+    }
+
+
+def serialize_users(*criteria, limit=None, fields=None):
+    """
+    Same as [u.serialize() for u in users matching criteria], in at most
+    three queries. Returns the first `limit` users by id, projected to
+    `fields`, when those are given.
+    """
+    users = (
+        db.session.query(
+            User.id,
+            User.netid,
+            User.graduation_year,
+            User.interests,
+            User.availability,
+        )
+        .filter(*criteria)
+        .order_by(User.id)
+        .limit(limit)
+        .all()
+    )
+    matching = _page_ids(users, User.id, criteria, limit)
+
+    completed = {}
+    if _wants(fields, "completed_courses"):
+        for user_id, course_number in db.session.query(
+            CompletedCourse.user_id, CompletedCourse.course_number
+        ).filter(CompletedCourse.user_id.in_(matching)):
+            completed.setdefault(user_id, []).append({"course_number": course_number})
+
+    schedules = {}
+    if _wants(fields, "generated_schedules"):
+        for row in (
+            db.session.query(
+                GeneratedSchedule.id,
+                GeneratedSchedule.user_id,
+                GeneratedSchedule.rationale,
+                GeneratedSchedule.score,
+            )
+            .filter(GeneratedSchedule.user_id.in_(matching))
+            .order_by(GeneratedSchedule.id)
+        ):
+            schedules.setdefault(row.user_id, []).append(
+                {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "rationale": row.rationale,
+                    "score": row.score,
+                }
+            )
+
+    return [
+        project(
+            {
+                "id": row.id,
+                "netid": row.netid,
+                "graduation_year": row.graduation_year,
+                "interests": row.interests,
+                "availability": display_availability(row.availability),
+                "completed_courses": completed.get(row.id, []),
+                "generated_schedules": schedules.get(row.id, []),
+            },
+            fields,
+        )
+        for row in users
+    ]
+
+
+def serialize_schedules(*criteria, limit=None, fields=None):
+    """
+    Same as [s.serialize() for s in schedules matching criteria], in at most
+    two queries. Returns the first `limit` schedules by id, projected to
+    `fields`, when those are given.
+    """
+    schedules = (
+        db.session.query(
+            GeneratedSchedule.id,
+            GeneratedSchedule.user_id,
+            GeneratedSchedule.score,
+            GeneratedSchedule.rationale,
+        )
+        .filter(*criteria)
+        .order_by(GeneratedSchedule.id)
+        .limit(limit)
+        .all()
+    )
+    matching = _page_ids(schedules, GeneratedSchedule.id, criteria, limit)
+
+    sections = {}
+    if _wants(fields, "sections"):
+        for row in (
+            db.session.query(ScheduleSection.schedule_id, *SECTION_COLUMNS)
+            .join(CourseSection, CourseSection.id == ScheduleSection.section_id)
+            .filter(ScheduleSection.schedule_id.in_(matching))
+            .order_by(ScheduleSection.schedule_id, ScheduleSection.section_id)
+        ):
+            sections.setdefault(row.schedule_id, []).append(section_payload(row))
+
+    return [
+        project(
+            {
+                "id": row.id,
+                "user_id": row.user_id,
+                "score": row.score,
+                "rationale": row.rationale,
+                "sections": sections.get(row.id, []),
+            },
+            fields,
+        )
+        for row in schedules
+    ]
+
+
+def serialize_sections(*criteria, limit=None, fields=None):
+    """
+    Same as [s.serialize() for s in sections matching criteria], in one query.
+    """
+    query = (
+        db.session.query(*SECTION_COLUMNS)
+        .filter(*criteria)
+        .order_by(CourseSection.id)
+        .limit(limit)
+    )
+    return [project(section_payload(row), fields) for row in query]
+
+
+def serialize_courses(*criteria, limit=None, fields=None):
+    """
+    Course.serialize(fields) for courses matching criteria, ordered by number.
+    Only the requested relations are loaded, with one query each.
+    """
+    options = [
+        selectinload(getattr(Course, name))
+        for name in ("sections", "prereqs", "required_by")
+        if _wants(fields, name)
+    ]
+    query = (
+        Course.query.options(*options)
+        .filter(*criteria)
+        .order_by(Course.number)
+        .limit(limit)
+    )
+    return [course.serialize(fields) for course in query]
+
+
+def _batch_size():
+    return current_app.config.get("STREAM_BATCH_SIZE", 500)
+
+
+def iter_sections():
+    """
+    Yield CourseSection.serialize() payloads for every section.
+    """
+    query = db.session.query(*SECTION_COLUMNS).order_by(CourseSection.id)
+    for row in query.yield_per(_batch_size()):
+        yield section_payload(row)
+
+
+def iter_courses():
+    """
+    Yield Course.serialize() payloads, loading relations per batch.
+    """
+    query = Course.query.options(
+        selectinload(Course.sections),
+        selectinload(Course.prereqs),
+        selectinload(Course.required_by),
+    )
+    for course in query.yield_per(_batch_size()):
+        yield course.serialize()
+
+
+def iter_users():
+    """
+    Yield User.serialize() payloads, loading relations per batch.
+    """
+    query = User.query.options(*user_load_options()).order_by(User.id)
+    for user in query.yield_per(_batch_size()):
+        yield user.serialize()
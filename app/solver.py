@@ -0,0 +1,127 @@
+import heapq
+import time
+from collections import namedtuple
+
+"""
+Exact top-K schedule search.
+
+Candidates are courses, each with a score and the sections the user can
+attend. A schedule picks at most one section per course, with no two
+sections conflicting, under the course and core caps, and at most one
+course per `group` (alternative courses for one core requirement). The
+search is a depth-first branch-and-bound over candidates in descending
+score order:
+every node picks the next course to add, so recursion depth is bounded by
+the course cap rather than the catalog size. A node is pruned once the best
+score it could still reach cannot beat the K-th best schedule found so far.
+
+Two schedules with the same set of courses count as one result; the first
+section assignment found for that set is kept.
+"""
+
+Candidate = namedtuple(
+    "Candidate", ["course", "kind", "score", "sections", "group"], defaults=(None,)
+)
+Solution = namedtuple("Solution", ["score", "sections"])
+SearchResult = namedtuple("SearchResult", ["solutions", "complete", "nodes"])
+
+CORE = "core"
+ELECTIVE = "elective"
+GRAD = "grad"
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def solve_top_k(candidates, conflicts, k=1, max_courses=5, max_core=3, budget_ms=None):
+    """
+    Return the k best conflict-free schedules as a SearchResult.
+
+    `conflicts` is CatalogIndex.conflicts. If `budget_ms` runs out before the
+    search space is exhausted, the best schedules found so far are returned
+    with `complete` set to False. The first schedule explored is the greedy
+    one, so a result is always available.
+    """
+    cands = sorted(
+        (c for c in candidates if c.sections), key=lambda c: c.score, reverse=True
+    )
+    n = len(cands)
+    prefix = [0.0]
+    for cand in cands:
+        prefix.append(prefix[-1] + cand.score)
+
+    deadline = (
+        time.perf_counter() + budget_ms / 1000.0 if budget_ms is not None else None
+    )
+    # min-heap of (score, -seq, key, sections); key is the set of courses
+    heap = []
+    in_heap = set()
+    counter = {"seq": 0, "nodes": 0}
+
+    def threshold():
+        return heap[0][0] if len(heap) >= k else None
+
+    def record(score, picked):
+        key = frozenset(sec.course_number for sec in picked)
+        if key in in_heap:
+            return
+        floor = threshold()
+        if floor is not None and score <= floor:
+            return
+        counter["seq"] += 1
+        heapq.heappush(heap, (score, -counter["seq"], key, tuple(picked)))
+        in_heap.add(key)
+        if len(heap) > k:
+            in_heap.discard(heapq.heappop(heap)[2])
+
+    def visit(start, chosen, picked, score, n_core, groups):
+        counter["nodes"] += 1
+        if (
+            deadline is not None
+            and counter["nodes"] & 255 == 0
+            and time.perf_counter() > deadline
+        ):
+            raise _OutOfTime()
+
+        remaining = max_courses - len(picked)
+        extended = False
+        if remaining > 0:
+            for j in range(start, n):
+                floor = threshold()
+                bound = score + prefix[min(j + remaining, n)] - prefix[j]
+                if floor is not None and bound <= floor:
+                    break
+                cand = cands[j]
+                if cand.kind == CORE and n_core >= max_core:
+                    continue
+                if cand.group is not None and cand.group in groups:
+                    continue
+                for sec in cand.sections:
+                    if conflicts[sec.pos] & chosen:
+                        continue
+                    extended = True
+                    picked.append(sec)
+                    visit(
+                        j + 1,
+                        chosen | (1 << sec.pos),
+                        picked,
+                        score + cand.score,
+                        n_core + (cand.kind == CORE),
+                        groups if cand.group is None else groups | {cand.group},
+                    )
+                    picked.pop()
+        if not extended:
+            record(score, picked)
+
+    complete = True
+    try:
+        visit(0, 0, [], 0.0, 0, frozenset())
+    except _OutOfTime:
+        complete = False
+
+    solutions = [
+        Solution(score, sections)
+        for score, _, _, sections in sorted(heap, reverse=True)
+    ]
+    return SearchResult(solutions, complete, counter["nodes"])
@@ -0,0 +1,82 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+"""
+Storage profile: which database to use and how to connect to it.
+
+DATABASE_URL selects the database (SQLite course.db by default). SQLite
+connections are switched to WAL with synchronous=NORMAL, so readers never
+block the writer and commits do not fsync the whole database, and get a
+larger page cache and memory-mapped reads. Server databases (Postgres,
+MySQL) get a connection pool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW.
+"""
+
+DEFAULT_DATABASE_URL = "sqlite:///course.db"
+
+# Page cache per SQLite connection, in KiB (negative = size, not pages)
+SQLITE_CACHE_KIB = int(os.environ.get("SQLITE_CACHE_KIB", 64 * 1024))
+SQLITE_MMAP_BYTES = int(os.environ.get("SQLITE_MMAP_BYTES", 256 * 1024 * 1024))
+# Seconds a writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 15))
+
+
+def database_url():
+    return os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the given database URL.
+    """
+    if is_sqlite(url):
+        # the app and job worker threads share connections from the pool
+        return {
+            "connect_args": {
+                "timeout": SQLITE_BUSY_TIMEOUT,
+                "check_same_thread": False,
+            }
+        }
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    Connect hook applying the SQLite pragmas to every new connection.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def configure(app):
+    """
+    Set the database config keys. Call before db.init_app(app).
+    """
+    url = database_url()
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(url)
+    app.config["SQLALCHEMY_ECHO"] = os.environ.get("SQLALCHEMY_ECHO") == "1"
+
+
+def init_engine(engine):
+    """
+    Install the connect hooks on an engine. Call inside the app context,
+    before the first connection is made.
+    """
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
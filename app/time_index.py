@@ -0,0 +1,82 @@
+import bisect
+from .availability import DAYS_PER_WEEK, MINUTES_PER_DAY, parse_days, slots_per_day
+
+"""
+Interval index over section meeting times, for "which sections fit" queries.
+
+For every day of the week the index keeps the sections meeting that day
+sorted by start time. A free mask (see app/availability.py) is cut into its
+runs of free slots per day, and the sections inside a run are found by
+bisecting the run's start and end into that day's start times and keeping
+those that also end within the run. A section fits when it is inside a run
+on every day it meets, so a query touches only the sections that start in
+free time instead of every section in the catalog.
+
+The answer is the same as `not section.mask & busy` (what schedule
+generation uses): meeting times are compared at the catalog's slot
+resolution, and sections without a meeting time fit anything.
+"""
+
+
+class SectionTimeIndex:
+    """
+    Per-day start-time index over a CatalogIndex's sections.
+    """
+
+    def __init__(self, sections, resolution):
+        self.resolution = resolution
+        # positions of sections with no occupied slot (eg. TBA)
+        self.untimed = []
+        # position -> number of days the section meets on
+        self.days_needed = {}
+        entries = [[] for _ in range(DAYS_PER_WEEK)]
+        for sec in sections:
+            if not sec.mask:
+                self.untimed.append(sec.pos)
+                continue
+            days = set(parse_days(sec.days))
+            self.days_needed[sec.pos] = len(days)
+            # clamped the same way as interval_mask
+            start = max(sec.start_min, 0)
+            end = min(sec.end_min, MINUTES_PER_DAY)
+            for day in days:
+                entries[day].append((start, end, sec.pos))
+        # per day: parallel lists sorted by start time
+        self.starts, self.ends, self.positions = [], [], []
+        for day_entries in entries:
+            day_entries.sort()
+            self.starts.append([start for start, _, _ in day_entries])
+            self.ends.append([end for _, end, _ in day_entries])
+            self.positions.append([pos for _, _, pos in day_entries])
+
+    def free_runs(self, free):
+        """
+        (day, start_min, end_min) for each run of free slots in a mask.
+        """
+        per_day = slots_per_day(self.resolution)
+        day_full = (1 << per_day) - 1
+        for day in range(DAYS_PER_WEEK):
+            bits = (free >> (day * per_day)) & day_full
+            while bits:
+                lo = (bits & -bits).bit_length() - 1
+                shifted = bits >> lo
+                length = (shifted ^ (shifted + 1)).bit_length() - 1
+                bits &= ~(((1 << length) - 1) << lo)
+                yield day, lo * self.resolution, (lo + length) * self.resolution
+
+    def fitting(self, free):
+        """
+        Positions, in catalog order, of the sections that fit in `free`.
+        """
+        hits = {}
+        for day, start, end in self.free_runs(free):
+            starts, ends = self.starts[day], self.ends[day]
+            positions = self.positions[day]
+            lo = bisect.bisect_left(starts, start)
+            hi = bisect.bisect_left(starts, end, lo)
+            for k in range(lo, hi):
+                if ends[k] <= end:
+                    hits[positions[k]] = hits.get(positions[k], 0) + 1
+        needed = self.days_needed
+        fit = [pos for pos, count in hits.items() if count == needed[pos]]
+        return sorted(fit + self.untimed)
@@ -1,4 +1,18 @@
 import json
+import re
+from flask import Response, current_app, request, stream_with_context
+
+try:
+    import orjson
+except ImportError:  # optional, see JSON_ENCODER
+    orjson = None
+
+# Bytes buffered before a streamed chunk is sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Subject (optional, CS when left out) and 4-digit number, eg. "MATH 1920",
+# "math-1920" or "2110"
+COURSE_NUMBER = re.compile(r"(?:([A-Za-z]{2,5})[ -]?)?(\d{4})")
 
 
 def success_response(data, code=200):
@@ -7,3 +21,83 @@ def success_response(data, code=200):
 
 def failure_response(message, code=404):
     return json.dumps({"error": message}), code
+
+
+def course_number(value):
+    """
+    Normalize a course number as written in a URL or request body to the
+    catalog's form, eg. "math-1920" -> "MATH 1920" and "2110" -> "CS 2110".
+    Raises ValueError when it is not one.
+    """
+    match = COURSE_NUMBER.fullmatch(str(value).strip())
+    if match is None:
+        raise ValueError(
+            "Course number must be a subject followed by the number, eg. 'CS 4820'."
+        )
+    subject, number = match.groups()
+    return f"{(subject or 'CS').upper()} {number}"
+
+
+def cached_response(payload, code=200):
+    """
+    Send a CachedPayload (see app/catalog.py): 304 when the client's
+    If-None-Match already has this ETag, the gzip body when it accepts gzip.
+    """
+    if request.if_none_match.contains_weak(payload.etag):
+        response = Response(status=304)
+    elif request.accept_encodings.quality("gzip") > 0:
+        response = Response(payload.gzipped, status=code, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(payload.body, status=code, mimetype="application/json")
+    response.set_etag(payload.etag, weak=True)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def wants_stream():
+    """
+    Whether a list endpoint should stream: ?stream=1, or STREAM_RESPONSES.
+    """
+    flag = request.args.get("stream")
+    if flag is not None:
+        return flag not in ("0", "false", "")
+    return current_app.config.get("STREAM_RESPONSES", False)
+
+
+def get_encoder():
+    """
+    Function turning one item into JSON bytes. Uses orjson when JSON_ENCODER
+    is "orjson" and it is installed, the standard library otherwise.
+    """
+    if orjson is not None and current_app.config.get("JSON_ENCODER") == "orjson":
+        return orjson.dumps
+    return lambda item: json.dumps(item).encode()
+
+
+def stream_response(key, items, code=200):
+    """
+    Stream {"<key>": [item, ...]} without building the list or the full
+    string in memory. `items` is an iterable of JSON-serializable dicts,
+    typically produced from a query with yield_per.
+    """
+    encode = get_encoder()
+
+    def generate():
+        buffer = bytearray(b'{"' + key.encode() + b'": [')
+        first = True
+        for item in items:
+            if not first:
+                buffer += b", "
+            buffer += encode(item)
+            first = False
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b"]}"
+        yield bytes(buffer)
+
+    return Response(
+        stream_with_context(generate()), status=code, mimetype="application/json"
+    )
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from .suite import run_suite
+
+"""
+Benchmark suite for the catalog, serializers, list endpoints and schedule
+generation on a synthetic catalog.
+
+    python -m benchmarks                      run and compare with the baseline
+    python -m benchmarks --save               run and save a new baseline
+    python -m benchmarks --courses 5000 --sections 10 --users 2000
+
+Each case reports its median time, SQL statement count and peak traced
+memory. When the baseline was recorded at the same scale, every case is
+compared with it: more queries, or time or memory beyond --tolerance, count
+as regressions and make the exit status 1. Timings depend on the machine,
+so save a baseline on the machine you compare on.
+
+benchmarks/storage.py is a separate benchmark for concurrent SQLite writes.
+"""
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+
+def load_baseline(path, scale):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != scale:
+        print(f"Baseline in {path} was recorded at another scale, not comparing.")
+        return None
+    return baseline["results"]
+
+
+def save_baseline(path, scale, results):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "scale": scale,
+                "results": {
+                    r.name: {
+                        "ms": round(r.ms, 3),
+                        "queries": r.queries,
+                        "peak_kib": round(r.peak_kib, 1),
+                    }
+                    for r in results
+                },
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def compare(result, base, tolerance):
+    """
+    Change against the baseline as text, and whether it is a regression.
+    """
+    if base is None:
+        return "new", False
+    regressed = (
+        result.ms > base["ms"] * (1 + tolerance)
+        or result.queries > base["queries"]
+        or result.peak_kib > base["peak_kib"] * (1 + tolerance)
+    )
+    change = (result.ms - base["ms"]) / base["ms"] * 100 if base["ms"] else 0
+    text = f"{change:+.0f}% time"
+    if result.queries != base["queries"]:
+        text += f", {result.queries - base['queries']:+d} queries"
+    return text, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedulr benchmark suite")
+    parser.add_argument("--courses", type=int, default=1000)
+    parser.add_argument("--sections", type=int, default=6, help="Per course.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="Only run cases whose name contains this.")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Save a new baseline.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed time and memory growth over the baseline (0.5 = 50%%).",
+    )
+    args = parser.parse_args(argv)
+    if args.save and args.only:
+        parser.error("--save records every case, so it cannot be used with --only")
+
+    scale = {
+        "courses": args.courses,
+        "sections": args.sections,
+        "users": args.users,
+        "seed": args.seed,
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_suite(
+            workdir,
+            args.courses,
+            args.sections,
+            args.users,
+            repeat=args.repeat,
+            only=args.only,
+            seed=args.seed,
+        )
+
+    baseline = None if args.save else load_baseline(args.baseline, scale)
+    regressions = 0
+    print(f"{'case':<28}{'ms':>12}{'queries':>10}{'peak KiB':>12}  baseline")
+    for result in results:
+        note = ""
+        if baseline is not None:
+            note, regressed = compare(result, baseline.get(result.name), args.tolerance)
+            if regressed:
+                regressions += 1
+                note += "  REGRESSION"
+        print(
+            f"{result.name:<28}{result.ms:>12.1f}{result.queries:>10}"
+            f"{result.peak_kib:>12.0f}  {note}"
+        )
+
+    if args.save:
+        save_baseline(args.baseline, scale, results)
+        print(f"Saved baseline to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
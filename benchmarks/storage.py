@@ -0,0 +1,157 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from app.models import (  # noqa: E402
+    db,
+    User,
+    Course,
+    CourseSection,
+    GeneratedSchedule,
+    ScheduleSection,
+)
+from app.storage import SQLITE_BUSY_TIMEOUT, set_sqlite_pragmas  # noqa: E402
+
+"""
+Concurrent write benchmark for the SQLite storage profile.
+
+Writer threads do what POST /schedules/generate/ does (insert a schedule and
+its sections in one transaction) while reader threads list sections, first
+on a database with SQLite's defaults (rollback journal, synchronous=FULL)
+and then with the pragmas from app/storage.py.
+
+    python benchmarks/storage.py --writers 8 --readers 4 --seconds 5
+"""
+
+PROFILES = ("default", "wal")
+SECTIONS = 200
+SECTIONS_PER_SCHEDULE = 5
+
+
+def make_engine(path, profile):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"timeout": SQLITE_BUSY_TIMEOUT, "check_same_thread": False},
+    )
+    if profile == "wal":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Course.__table__).values(number="CS 1110", name="Intro"))
+        conn.execute(
+            insert(CourseSection.__table__),
+            [
+                {
+                    "course_number": "CS 1110",
+                    "section": f"LEC {i:03}",
+                    "days": "MWF",
+                    "start_min": 480 + i,
+                    "end_min": 530 + i,
+                }
+                for i in range(SECTIONS)
+            ],
+        )
+        user_id = conn.execute(
+            insert(User.__table__).values(netid="bench", graduation_year="2027")
+        ).inserted_primary_key[0]
+    return engine, user_id
+
+
+def writer(engine, user_id, stop, latencies, errors):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                schedule_id = conn.execute(
+                    insert(GeneratedSchedule.__table__).values(
+                        user_id=user_id, score=1.0, rationale="bench"
+                    )
+                ).inserted_primary_key[0]
+                conn.execute(
+                    insert(ScheduleSection.__table__),
+                    [
+                        {
+                            "schedule_id": schedule_id,
+                            "section_id": (i + k) % SECTIONS + 1,
+                        }
+                        for k in range(SECTIONS_PER_SCHEDULE)
+                    ],
+                )
+        except OperationalError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def reader(engine, stop, reads):
+    query = select(CourseSection.__table__)
+    while not stop.is_set():
+        with engine.connect() as conn:
+            conn.execute(query).fetchall()
+        reads.append(1)
+
+
+def run(profile, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, user_id = make_engine(os.path.join(tmp, "bench.db"), profile)
+        stop = threading.Event()
+        latencies, errors, reads = [], [], []
+        threads = [
+            threading.Thread(
+                target=writer, args=(engine, user_id, stop, latencies, errors)
+            )
+            for _ in range(writers)
+        ] + [
+            threading.Thread(target=reader, args=(engine, stop, reads))
+            for _ in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "writes/s": len(latencies) / seconds,
+        "reads/s": len(reads) / seconds,
+        "p50 ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p95 ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        "errors": len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite storage profile benchmark")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args(argv)
+
+    columns = ("profile", "writes/s", "reads/s", "p50 ms", "p95 ms", "errors")
+    print("".join(f"{c:>12}" for c in columns))
+    for profile in PROFILES:
+        row = run(profile, args.writers, args.readers, args.seconds)
+        print(
+            "".join(
+                f"{row[c]:>12.1f}" if isinstance(row[c], float) else f"{row[c]:>12}"
+                for c in columns
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
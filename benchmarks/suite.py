@@ -0,0 +1,241 @@
+import json
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import namedtuple
+from sqlalchemy import delete, event
+from .synthetic import make_roster, make_users
+
+"""
+The benchmark cases and the code that measures them.
+
+Every case is run `repeat` times for the median wall time, with SQL
+statements counted through a before_cursor_execute listener, and once more
+under tracemalloc for the peak memory it allocates (tracing slows code down,
+so that run is not timed). A setup step that is not measured runs before
+each of these runs, eg. emptying a table before a seed.
+
+The app runs against a fresh SQLite database in a temporary directory. The
+stub ranker orders electives by a hash of the interests and course number,
+so generation is repeatable and never calls the LLM.
+"""
+
+Result = namedtuple("Result", ["name", "ms", "queries", "peak_kib"])
+Case = namedtuple("Case", ["name", "run", "setup"])
+
+GENERATE_USERS = 50
+BATCH_USERS = 500
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements an engine executes.
+    """
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+
+def stub_rank_courses(courses, interests, remaining_slots):
+    """
+    Same contract as gpt_rank_courses, ordered by a hash instead of the LLM.
+    """
+    return sorted(
+        courses, key=lambda pair: zlib.crc32(f"{interests}|{pair[0].number}".encode())
+    )[:remaining_slots]
+
+
+def measure(case, counter, repeat):
+    times = []
+    queries = 0
+    for _ in range(repeat):
+        if case.setup:
+            case.setup()
+        counter.reset()
+        start = time.perf_counter()
+        case.run()
+        times.append((time.perf_counter() - start) * 1000)
+        queries = counter.count
+
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    try:
+        case.run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return Result(case.name, statistics.median(times), queries, peak / 1024)
+
+
+def make_app(workdir):
+    """
+    The app on an empty database in `workdir`, with the stub ranker.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["RANKER_INDEX_PATH"] = os.path.join(workdir, "tfidf_index.npz")
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["RANKER"] = "stub"
+
+    from app import create_app
+    from app.ranker import RANKERS
+
+    RANKERS.setdefault("stub", stub_rank_courses)
+    return create_app()
+
+
+def add_users(payloads):
+    """
+    Insert benchmark users with their availability and completed courses.
+    """
+    from app.availability import apply_availability
+    from app.models import db, User, CompletedCourse
+
+    users = []
+    for payload in payloads:
+        user = User(
+            netid=payload["netid"],
+            graduation_year=payload["graduation_year"],
+            interests=payload["interests"],
+        )
+        apply_availability(user, payload["availability"])
+        user.completed_courses = [
+            CompletedCourse(course_number=num) for num in payload["completed"]
+        ]
+        users.append(user)
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+def seed_cases(roster):
+    """
+    The seed_* functions, each timed on its emptied table.
+    """
+    from app.models import db, Course, CoursePrereq, CourseSection
+    from app.scripts.scraper import seed_courses, seed_prereq, seed_schedules
+
+    def emptied(model):
+        def setup():
+            db.session.execute(delete(model))
+            db.session.commit()
+
+        return setup
+
+    return [
+        Case("seed_courses", lambda: seed_courses(roster), emptied(Course)),
+        Case("seed_prereq", lambda: seed_prereq(roster), emptied(CoursePrereq)),
+        Case(
+            "seed_schedules", lambda: seed_schedules(roster), emptied(CourseSection)
+        ),
+    ]
+
+
+def read_cases(client, user_ids):
+    """
+    Catalog build, serializers, list endpoints and schedule generation.
+    """
+    from app.candidates import get_pool_cache
+    from app.catalog import rebuild_catalog
+    from app.models import Course, User
+    from app.serializers import user_load_options
+
+    def serialize_courses():
+        return [course.serialize() for course in Course.query.all()]
+
+    def serialize_users():
+        users = User.query.options(*user_load_options()).all()
+        return [user.serialize() for user in users]
+
+    generate_ids = user_ids[:GENERATE_USERS]
+    batch_ids = user_ids[:BATCH_USERS]
+
+    def generate():
+        for user_id in generate_ids:
+            client.post("/schedules/generate/", data=json.dumps({"user_id": user_id}))
+
+    def generate_batch():
+        client.post(
+            "/schedules/generate/batch/", data=json.dumps({"user_ids": batch_ids})
+        )
+
+    # the list endpoints are measured on a new catalog, before their cached
+    # payloads exist
+    return [
+        Case("rebuild_catalog", rebuild_catalog, None),
+        Case("Course.serialize", serialize_courses, None),
+        Case("User.serialize", serialize_users, None),
+        Case("GET /courses/", lambda: client.get("/courses/"), rebuild_catalog),
+        Case(
+            "GET /courses/sections/",
+            lambda: client.get("/courses/sections/"),
+            rebuild_catalog,
+        ),
+        Case("GET /users/", lambda: client.get("/users/"), None),
+        Case(f"generate x{len(generate_ids)}", generate, get_pool_cache().clear),
+        Case(
+            f"generate batch x{len(batch_ids)}", generate_batch, get_pool_cache().clear
+        ),
+    ]
+
+
+def prepare(roster, user_payloads):
+    """
+    Seed the catalog and users once, so every case has data to work on.
+    """
+    from app.catalog import bump_catalog_version, rebuild_catalog
+    from app.scripts.scraper import (
+        seed_core,
+        seed_courses,
+        seed_prereq,
+        seed_schedules,
+    )
+
+    seed_courses(roster)
+    seed_core()
+    seed_prereq(roster)
+    seed_schedules(roster)
+    bump_catalog_version()
+    rebuild_catalog()
+    return add_users(user_payloads)
+
+
+def run_suite(workdir, courses, sections, users, repeat=3, only=None, seed=0):
+    """
+    Build the synthetic data, run every case (or those whose name contains
+    `only`) and return their Results.
+    """
+    roster = make_roster(courses, sections, seed=seed)
+    numbers = [f"{c['subject']} {c['catalogNbr']}" for c in roster]
+    user_payloads = make_users(users, numbers, seed=seed)
+
+    app = make_app(workdir)
+    results = []
+    with app.app_context():
+        from app.catalog import rebuild_catalog
+        from app.models import db
+
+        counter = QueryCounter(db.engine)
+        user_ids = prepare(roster, user_payloads)
+        for cases in (seed_cases(roster), read_cases(app.test_client(), user_ids)):
+            for case in cases:
+                if not only or only in case.name:
+                    results.append(measure(case, counter, repeat))
+            # re-seeded sections have new ids
+            rebuild_catalog()
+        db.session.remove()
+        db.engine.dispose()
+    return results
@@ -0,0 +1,172 @@
+import random
+
+"""
+Synthetic catalog and users for the benchmarks.
+
+make_roster returns classes in the roster API's format, so they go through
+the same parsing and seeding code as a real roster. Course numbers are
+spread over several subjects and levels, higher-level courses name a few
+lower-level ones in their prerequisite text ("A or B, and C"), and every
+course gets lectures and discussions at random times. The CS core courses
+are always included. Everything is drawn from a seeded RNG, so the same
+arguments give the same catalog.
+"""
+
+SUBJECTS = ("CS", "MATH", "ECE", "INFO", "ORIE", "PHYS", "STSCI", "BIOCB")
+CORE_NUMBERS = (
+    "CS 1110",
+    "CS 1112",
+    "CS 2110",
+    "CS 2800",
+    "CS 3110",
+    "CS 3410",
+    "CS 3420",
+    "CS 4410",
+    "CS 4414",
+    "CS 4820",
+)
+TOPICS = (
+    "machine learning",
+    "operating systems",
+    "databases",
+    "computer graphics",
+    "networks",
+    "compilers",
+    "algorithms",
+    "security",
+    "robotics",
+    "computer vision",
+    "natural language processing",
+    "distributed systems",
+    "human computer interaction",
+    "game design",
+    "cryptography",
+    "optimization",
+    "probability",
+    "signal processing",
+    "data science",
+    "programming languages",
+)
+# How far back in level order prerequisites are drawn from
+PREREQ_WINDOW = 200
+PATTERNS = ("MWF", "TR", "MW", "WF", "M", "T", "W", "R", "F")
+DURATIONS = (50, 75, 115, 165)
+
+
+def clock(minutes):
+    hour, minute = divmod(minutes, 60)
+    return f"{hour % 12 or 12:02d}:{minute:02d}{'AM' if hour < 12 else 'PM'}"
+
+
+def course_numbers(courses, rnd):
+    """
+    `courses` distinct course numbers (core courses included), sorted by
+    level so prerequisites can point at earlier entries.
+    """
+    numbers = set(CORE_NUMBERS)
+    while len(numbers) < max(courses, len(CORE_NUMBERS)):
+        subject = rnd.choice(SUBJECTS)
+        level = rnd.choices((1, 2, 3, 4, 5, 6), weights=(2, 3, 4, 5, 3, 1))[0]
+        numbers.add(f"{subject} {level}{rnd.randrange(1000):03d}")
+    return sorted(numbers, key=lambda num: (num.split()[1], num))
+
+
+def prereq_text(lower, rnd):
+    """
+    Prerequisite sentence naming up to three groups of lower-level courses.
+    """
+    if not lower or rnd.random() < 0.3:
+        return ""
+    groups = []
+    for _ in range(rnd.randint(1, 3)):
+        options = rnd.sample(lower, min(len(lower), rnd.randint(1, 2)))
+        groups.append(" or ".join(options))
+    text = "Prerequisite: " + ", and ".join(groups) + "."
+    if rnd.random() < 0.1:
+        text += f" Corequisite: {rnd.choice(lower)}."
+    return text
+
+
+def make_sections(sections, rnd):
+    result = []
+    for k in range(sections):
+        start = rnd.randrange(8 * 60, 20 * 60, 5)
+        result.append(
+            {
+                "ssrComponent": "LEC" if k == 0 else rnd.choice(("DIS", "LAB")),
+                "section": f"{k + 1:03d}",
+                "meetings": [
+                    {
+                        "pattern": rnd.choice(PATTERNS),
+                        "timeStart": clock(start),
+                        "timeEnd": clock(start + rnd.choice(DURATIONS)),
+                    }
+                ],
+            }
+        )
+    return result
+
+
+def make_roster(courses=1000, sections_per_course=6, seed=0):
+    """
+    Roster classes for `courses` courses with `sections_per_course` one-
+    meeting sections each.
+    """
+    rnd = random.Random(seed)
+    numbers = course_numbers(courses, rnd)
+    roster = []
+    for i, number in enumerate(numbers):
+        subject, catalog_nbr = number.split()
+        level = catalog_nbr[0]
+        # prerequisites come from the lower-level courses just before this one
+        window = numbers[max(0, i - PREREQ_WINDOW) : i]
+        lower = [num for num in window if num.split()[1][0] < level]
+        topic = rnd.choice(TOPICS)
+        roster.append(
+            {
+                "subject": subject,
+                "catalogNbr": catalog_nbr,
+                "titleLong": f"{topic.title()} {catalog_nbr}",
+                "description": (
+                    f"An introduction to {topic} with applications to "
+                    f"{rnd.choice(TOPICS)} and {rnd.choice(TOPICS)}."
+                ),
+                "catalogPrereqCoreq": prereq_text(lower, rnd),
+                "enrollGroups": [
+                    {
+                        "unitsMinimum": rnd.choice((3, 4)),
+                        "classSections": make_sections(sections_per_course, rnd),
+                    }
+                ],
+            }
+        )
+    return roster
+
+
+def make_users(users, numbers, seed=0):
+    """
+    User payloads (as accepted by POST /users/) plus completed courses, drawn
+    from the lower-level courses in `numbers`.
+    """
+    rnd = random.Random(seed)
+    intro = [num for num in numbers if num.split()[1][0] in "12"]
+    result = []
+    for i in range(users):
+        windows = [
+            {
+                "days": rnd.choice(("MWF", "TR", "MTWRF")),
+                "start_min": rnd.randrange(8 * 60, 12 * 60, 30),
+                "end_min": rnd.randrange(15 * 60, 21 * 60, 30),
+            }
+            for _ in range(rnd.randint(1, 3))
+        ]
+        result.append(
+            {
+                "netid": f"bench{i}",
+                "graduation_year": str(rnd.randint(2026, 2029)),
+                "interests": ", ".join(rnd.sample(TOPICS, rnd.randint(1, 3))),
+                "availability": windows,
+                "completed": rnd.sample(intro, min(len(intro), rnd.randint(0, 8))),
+            }
+        )
+    return result
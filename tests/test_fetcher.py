@@ -0,0 +1,119 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+from app.scripts.fetcher import RosterFetcher
+from app.scripts.scraper import Snapshot
+
+"""
+RosterFetcher against a local stand-in for the class roster API, which serves
+a few classes per subject with an ETag and can fail a request once.
+"""
+
+
+def roster_classes(roster, subject):
+    return [
+        {"catalogNbr": str(1000 + i), "titleLong": f"{roster} {subject} {i}"}
+        for i in range(3)
+    ]
+
+
+class RosterServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RosterHandler)
+        self.requests = []
+        self.fail_once = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class RosterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, body=b"", headers=()):
+        self.send_response(code)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        key = (query["roster"][0], query["subject"][0])
+        if key in self.server.fail_once:
+            self.server.fail_once.discard(key)
+            self.server.requests.append((key, 503))
+            return self.reply(503)
+        data = {"status": "success", "data": {"classes": roster_classes(*key)}}
+        body = json.dumps(data).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.requests.append((key, 304))
+            return self.reply(304, headers=[("ETag", etag)])
+        self.server.requests.append((key, 200))
+        self.reply(200, body, [("ETag", etag), ("Content-Type", "application/json")])
+
+
+@pytest.fixture
+def server():
+    server = RosterServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def snapshot_titles(path):
+    return sorted(clss["titleLong"] for clss in Snapshot(path))
+
+
+def test_fetch_merges_subjects_of_one_roster(server, tmp_path):
+    fetcher = RosterFetcher(server.url, str(tmp_path / "cache"))
+    snapshot = str(tmp_path / "roster.jsonl.gz")
+    stats = fetcher.fetch("SP25", ["CS", "MATH"], snapshot)
+
+    assert stats == {"downloaded": 2, "not_modified": 0}
+    assert sorted(key for key, _ in server.requests) == [
+        ("SP25", "CS"),
+        ("SP25", "MATH"),
+    ]
+    classes = list(Snapshot(snapshot))
+    assert {clss["subject"] for clss in classes} == {"CS", "MATH"}
+    assert snapshot_titles(snapshot) == sorted(
+        clss["titleLong"]
+        for subject in ("CS", "MATH")
+        for clss in roster_classes("SP25", subject)
+    )
+
+
+def test_fetch_reuses_unmodified_subjects(server, tmp_path):
+    cache = str(tmp_path / "cache")
+    snapshot = str(tmp_path / "roster.jsonl.gz")
+    RosterFetcher(server.url, cache).fetch("FA24", ["CS", "MATH"], snapshot)
+    first = snapshot_titles(snapshot)
+
+    # a new fetcher reads the stored validators back
+    stats = RosterFetcher(server.url, cache).fetch("FA24", ["CS", "MATH"], snapshot)
+    assert stats == {"downloaded": 0, "not_modified": 2}
+    assert [code for _, code in server.requests[-2:]] == [304, 304]
+    assert snapshot_titles(snapshot) == first
+
+
+def test_fetch_retries_server_errors(server, tmp_path):
+    server.fail_once.add(("FA24", "CS"))
+    snapshot = str(tmp_path / "roster.jsonl.gz")
+    stats = RosterFetcher(server.url, str(tmp_path / "cache")).fetch(
+        "FA24", ["CS"], snapshot
+    )
+    assert stats == {"downloaded": 1, "not_modified": 0}
+    assert [code for _, code in server.requests] == [503, 200]
+    assert len(list(Snapshot(snapshot))) == 3
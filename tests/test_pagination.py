@@ -0,0 +1,31 @@
+import pytest
+from flask import Flask
+from app.pagination import encode_cursor, page_params
+
+
+@pytest.fixture
+def request_context():
+    app = Flask(__name__)
+    return app.test_request_context
+
+
+@pytest.mark.parametrize("key, value", [("id", 42), ("number", "CS 2110")])
+def test_cursor_round_trip(request_context, key, value):
+    with request_context(f"/?after={encode_cursor(value)}"):
+        assert page_params((key,), key).after == value
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [("id", {"a": 1}), ("id", "7"), ("id", True), ("id", None), ("number", 7)],
+)
+def test_cursor_of_wrong_type(request_context, key, value):
+    with request_context(f"/?after={encode_cursor(value)}"):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            page_params((key,), key)
+
+
+def test_cursor_not_base64_json(request_context):
+    with request_context("/?after=not-a-cursor"):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            page_params(("id",), "id")
@@ -0,0 +1,44 @@
+import pytest
+from app.prereqs import parse_requirements
+
+
+@pytest.mark.parametrize(
+    "text, tree",
+    [
+        ("CS 2110", "CS 2110"),
+        ("CS 2110 or CS 2112", {"or": ["CS 2110", "CS 2112"]}),
+        ("CS 2110, CS 2112, or CS 2800", {"or": ["CS 2110", "CS 2112", "CS 2800"]}),
+        (
+            "Prerequisite: CS 2110 or CS 2112, and CS 2800.",
+            {"and": [{"or": ["CS 2110", "CS 2112"]}, "CS 2800"]},
+        ),
+        (
+            "Prerequisite: CS 2110, CS 2800, and CS 3110, or permission of "
+            "instructor.",
+            {"and": ["CS 2110", "CS 2800", "CS 3110"]},
+        ),
+        (
+            "CS 2110 or CS 2112, CS 2800 or CS 2802, or permission of instructor.",
+            {"and": [{"or": ["CS 2110", "CS 2112"]}, {"or": ["CS 2800", "CS 2802"]}]},
+        ),
+        ("CS 3110, or graduate standing.", "CS 3110"),
+        ("CS 2110, CS 2800, or equivalent", {"and": ["CS 2110", "CS 2800"]}),
+        ("CS 2110 or permission of instructor", "CS 2110"),
+        (
+            "CS 2110 (or CS 2112) and CS 2800",
+            {"and": [{"or": ["CS 2110", "CS 2112"]}, "CS 2800"]},
+        ),
+        (
+            "CS 2110 (with a grade of C or better) and CS 2800",
+            {"and": ["CS 2110", "CS 2800"]},
+        ),
+        (
+            "Prerequisite: CS 2110. Corequisite: CS 2800.",
+            {"and": ["CS 2110", {"coreq": "CS 2800"}]},
+        ),
+        ("Recommended prerequisite: CS 2110.", None),
+        ("Permission of instructor.", None),
+    ],
+)
+def test_parse_requirements(text, tree):
+    assert parse_requirements(text) == tree
@@ -0,0 +1,134 @@
+import itertools
+import pytest
+from sqlalchemy import event
+
+"""
+The list endpoints load related rows with a fixed number of queries, so the
+SQL statement count of a request must not grow with the rows it returns.
+Each test counts the statements of one request at N rows and again at 10·N.
+"""
+
+N = 20
+SECTIONS = 40
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("query_counts")
+    from app import create_app
+    from app.models import db, Course, CourseSection
+
+    # create_app reads its config from the environment; restored afterwards
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", f"sqlite:///{workdir / 'test.db'}")
+        mp.setenv("RANKER_INDEX_PATH", str(workdir / "tfidf_index.npz"))
+        mp.setenv("JOB_WORKERS", "0")
+        mp.setenv("CATALOG_VERSION_CHECK", "3600")
+        app = create_app()
+
+    with app.app_context():
+        courses = [
+            Course(number=f"CS {1000 + i}", name=f"Course {i}") for i in range(4)
+        ]
+        db.session.add_all(courses)
+        db.session.add_all(
+            CourseSection(
+                course_number=courses[i % len(courses)].number,
+                section=f"LEC {i:03d}",
+                days="MWF",
+                start_min=480 + 10 * i,
+                end_min=530 + 10 * i,
+            )
+            for i in range(SECTIONS)
+        )
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def count_queries(app):
+    from app.models import db
+
+    def count(client, path):
+        # the first request warms up caches that are filled once
+        client.get(path)
+        queries = []
+
+        def listener(conn, cursor, statement, *args):
+            queries.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            response = client.get(path)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        assert response.status_code == 200
+        return len(queries)
+
+    return count
+
+
+def add_user(netid, schedules=0):
+    """
+    A user with two completed courses and `schedules` schedules.
+    """
+    from app.models import db, User, CompletedCourse
+
+    user = User(netid=netid, graduation_year="2027", availability="1" * 168)
+    user.completed_courses = [
+        CompletedCourse(course_number=f"CS {1000 + i}") for i in range(2)
+    ]
+    db.session.add(user)
+    db.session.commit()
+    add_schedules(user.id, schedules)
+    return user.id
+
+
+def add_schedules(user_id, total):
+    """
+    Grow a user's schedules to `total`, each a distinct pair of sections.
+    """
+    from app.models import db, GeneratedSchedule, ScheduleSection, CourseSection
+    from app.schedule_store import schedule_hash
+
+    section_ids = [row.id for row in db.session.query(CourseSection.id)]
+    existing = GeneratedSchedule.query.filter_by(user_id=user_id).count()
+    pairs = itertools.combinations(section_ids, 2)
+    for pair in itertools.islice(pairs, existing, total):
+        schedule = GeneratedSchedule(
+            user_id=user_id,
+            score=1.0,
+            rationale="test",
+            content_hash=schedule_hash(pair),
+        )
+        schedule.schedule_sections = [ScheduleSection(section_id=i) for i in pair]
+        db.session.add(schedule)
+    db.session.commit()
+
+
+def test_list_users_query_count(app, count_queries):
+    client = app.test_client()
+    with app.app_context():
+        for i in range(N):
+            add_user(f"few{i}", schedules=2)
+    few = count_queries(client, "/users/")
+
+    with app.app_context():
+        for i in range(9 * N):
+            add_user(f"many{i}", schedules=2)
+    many = count_queries(client, "/users/")
+    assert many == few
+
+
+def test_list_schedules_query_count(app, count_queries):
+    client = app.test_client()
+    with app.app_context():
+        user_id = add_user("scheduled", schedules=N)
+    few = count_queries(client, f"/schedules/{user_id}/")
+
+    with app.app_context():
+        add_schedules(user_id, 10 * N)
+    many = count_queries(client, f"/schedules/{user_id}/")
+    assert many == few